@@ -3,7 +3,9 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import networkx as nx
-import re
+
+from prediction import SEQUENCE_ALGORITHM, PredictionCache, PredictionEngine, load_sequence_index, rules_signature
+from usedAlgorithme.rule_store import load_frame, load_metadata
 
 # Page configuration
 st.set_page_config(
@@ -219,54 +221,32 @@ st.markdown("""
 
 # ======================== DATA LOADING ========================
 
-def parse_frozenset(frozenset_str):
-    """Parse frozenset string from CSV back to Python set"""
-    if pd.isna(frozenset_str):
-        return frozenset()
-    
-    match = re.search(r"frozenset\(\{(.+?)\}\)", str(frozenset_str))
-    if match:
-        items_str = match.group(1)
-        items = re.findall(r"'([^']+)'", items_str)
-        return frozenset(items)
-    return frozenset()
-
-
-@st.cache_data
-def load_precomputed_rules():
-    """Load pre-computed rules from CSV files (Apriori, FP-Growth, ECLAT)"""
+@st.cache_data(max_entries=1)
+def load_precomputed_rules(signature):
+    """
+    Load pre-computed rules (Apriori, FP-Growth, ECLAT) from their binary stores or CSV files.
+    signature (see rules_signature) changes when a mining job rewrites them, which reloads them.
+    """
     apriori_rules = pd.DataFrame()
     fp_rules = pd.DataFrame()
     eclat_rules = pd.DataFrame()
     
     try:
-        apriori_rules = pd.read_csv('./Data/apriori/apriori_rules.csv')
-        if 'antecedents' in apriori_rules.columns:
-            apriori_rules['antecedents'] = apriori_rules['antecedents'].apply(parse_frozenset)
-        if 'consequents' in apriori_rules.columns:
-            apriori_rules['consequents'] = apriori_rules['consequents'].apply(parse_frozenset)
+        apriori_rules = load_frame('./Data/apriori/apriori_rules.csv')
     except FileNotFoundError:
         st.warning("apriori_rules.csv not found!")
     except Exception as e:
         st.error(f"Error loading apriori rules: {e}")
     
     try:
-        fp_rules = pd.read_csv('./Data/fp_growth/fp_rules.csv')
-        if 'antecedents' in fp_rules.columns:
-            fp_rules['antecedents'] = fp_rules['antecedents'].apply(parse_frozenset)
-        if 'consequents' in fp_rules.columns:
-            fp_rules['consequents'] = fp_rules['consequents'].apply(parse_frozenset)
+        fp_rules = load_frame('./Data/fp_growth/fp_rules.csv')
     except FileNotFoundError:
         st.warning("fp_rules.csv not found!")
     except Exception as e:
         st.error(f"Error loading fp-growth rules: {e}")
     
     try:
-        eclat_rules = pd.read_csv('./Data/ECLAT/ECLAT_rules.csv')
-        if 'antecedents' in eclat_rules.columns:
-            eclat_rules['antecedents'] = eclat_rules['antecedents'].apply(parse_frozenset)
-        if 'consequents' in eclat_rules.columns:
-            eclat_rules['consequents'] = eclat_rules['consequents'].apply(parse_frozenset)
+        eclat_rules = load_frame('./Data/ECLAT/ECLAT_rules.csv')
     except FileNotFoundError:
         st.warning("ECLAT_rules.csv not found in Data/ECLAT/")
     except Exception as e:
@@ -275,6 +255,41 @@ def load_precomputed_rules():
     return apriori_rules, fp_rules, eclat_rules
 
 
+# Rules exports whose mining jobs write run metadata next to them
+RULE_EXPORTS = {
+    'Apriori': './Data/apriori/apriori_rules.csv',
+    'FP-Growth': './Data/fp_growth/fp_rules.csv',
+    'ECLAT': './Data/ECLAT/ECLAT_rules.csv',
+}
+BENCHMARK_RESULTS = './Data/benchmark/results.csv'
+# Runs that time each algorithm on its own (incremental runs are shared by the algorithms they write)
+OWN_RUN_EXECUTORS = ['process', 'thread', 'serial']
+
+
+def load_run_metadata():
+    """Mining time, memory and candidates of the last run of each algorithm (small JSON files, not cached)"""
+    metadata = {}
+    for name, csv_path in RULE_EXPORTS.items():
+        try:
+            meta = load_metadata(csv_path)
+        except Exception as e:
+            st.error(f"Error loading {name} run metadata: {e}")
+            meta = None
+        if meta is not None:
+            metadata[name] = meta
+    return metadata
+
+
+def load_benchmark_results():
+    """Latest benchmark measure of every (dataset, size, support, algorithm), None without results"""
+    try:
+        results = pd.read_csv(BENCHMARK_RESULTS)
+    except FileNotFoundError:
+        return None
+    results = results[results['status'] == 'ok']
+    return results.drop_duplicates(['dataset', 'transactions', 'min_support', 'algorithm'], keep='last')
+
+
 @st.cache_data
 def get_all_paths(apriori_rules, fp_rules, eclat_rules):
     """Extract all unique paths from rules"""
@@ -288,59 +303,30 @@ def get_all_paths(apriori_rules, fp_rules, eclat_rules):
     return sorted(list(all_paths))
 
 
-# get_predictions remains the same logic and works for any rule dataframe
+@st.cache_resource
+def get_prediction_cache():
+    """Predictions of every session seen, shared by all reruns and browser sessions"""
+    return PredictionCache()
 
-def get_predictions(user_paths, rules_df, top_n=20):
-    """Get page predictions based on user's browsing session"""
-    if not user_paths or rules_df is None or len(rules_df) == 0:
-        return pd.DataFrame()
-    
-    user_set = set(user_paths)
-    predictions = {}
-    
-    for _, rule in rules_df.iterrows():
-        antecedents = rule.get('antecedents', frozenset())
-        consequents = rule.get('consequents', frozenset())
-        # skip malformed rows
-        if not antecedents or not isinstance(antecedents, (set, frozenset)):
-            continue
-        if not consequents or not isinstance(consequents, (set, frozenset)):
-            continue
-        
-        if antecedents and antecedents.issubset(user_set):
-            # build a score that prefers higher confidence and slightly rewards lift
-            confidence = float(rule.get('confidence', 0))
-            lift = float(rule.get('lift', 1))
-            support = float(rule.get('support', 0))
-            score = confidence * (1 + (lift - 1) * 0.1)
-            
-            for page in consequents:
-                if page not in user_set:
-                    if page not in predictions or score > predictions[page]['score']:
-                        predictions[page] = {
-                            'score': score,
-                            'confidence': confidence,
-                            'lift': lift,
-                            'support': support,
-                            'based_on': ', '.join(sorted(antecedents))
-                        }
-    
-    if not predictions:
+
+@st.cache_resource(max_entries=1)
+def get_prediction_engine(signature, _apriori_rules, _fp_rules, _eclat_rules):
+    """
+    Build the rule index of every algorithm (and load the sequence model, when built)
+    once per version of the rules (same engine as the HTTP service)
+    """
+    sequence_index = load_sequence_index()
+    indexes = {SEQUENCE_ALGORITHM: sequence_index} if sequence_index is not None else None
+    return PredictionEngine({'Apriori': _apriori_rules, 'FP-Growth': _fp_rules, 'ECLAT': _eclat_rules},
+                            cache=get_prediction_cache(), signature=signature, indexes=indexes)
+
+
+def get_predictions(user_paths, algorithm, top_n=20):
+    """Get page predictions based on user's browsing session (cached: slider moves only cut the ranked list)"""
+    if not user_paths:
         return pd.DataFrame()
-    
-    results = pd.DataFrame([
-        {
-            'Predicted Page': page,
-            'Confidence': data['confidence'],
-            'Lift': data['lift'],
-            'Support': data['support'],
-            'Score': data['score'],
-            'Based On': data['based_on']
-        }
-        for page, data in predictions.items()
-    ])
-    
-    return results.sort_values('Score', ascending=False).head(top_n)
+    engine = get_prediction_engine(rules_version, apriori_rules, fp_rules, eclat_rules)
+    return engine.predict_frame(algorithm, user_paths, top_n)
 
 
 # ======================== MAIN APP ========================
@@ -351,7 +337,8 @@ st.markdown('<p class="sub-header">AI-Powered Navigation Pattern Analysis with A
 
 # Load pre-computed rules
 with st.spinner("Loading pre-computed association rules..."):
-    apriori_rules, fp_rules, eclat_rules = load_precomputed_rules()
+    rules_version = rules_signature()
+    apriori_rules, fp_rules, eclat_rules = load_precomputed_rules(rules_version)
     all_paths = get_all_paths(apriori_rules, fp_rules, eclat_rules)
 
 if len(apriori_rules) == 0 and len(fp_rules) == 0 and len(eclat_rules) == 0:
@@ -397,18 +384,22 @@ with tab1:
     col1, col2 = st.columns([2, 1])
     
     with col1:
+        engine = get_prediction_engine(rules_version, apriori_rules, fp_rules, eclat_rules)
+        algorithms = ["Apriori", "FP-Growth", "ECLAT"]
+        if SEQUENCE_ALGORITHM in engine.indexes:
+            algorithms.append(SEQUENCE_ALGORITHM)
         algorithm = st.radio(
             "Select Algorithm",
-            ["Apriori", "FP-Growth", "ECLAT"],
+            algorithms,
             horizontal=True
         )
         
-        rules_for_prediction = apriori_rules if algorithm == "Apriori" else (fp_rules if algorithm == "FP-Growth" else (eclat_rules if algorithm == "ECLAT" else None))
-        
+        sequential = algorithm == SEQUENCE_ALGORITHM
         selected_paths = st.multiselect(
             "🔍 Select visited pages:",
-            options=all_paths,
-            placeholder="Start typing to search..."
+            options=sorted(engine.index(algorithm).pages) if sequential else all_paths,
+            placeholder="Start typing to search...",
+            help="Select them in visit order: the Sequential model predicts from the last pages visited."
         )
         
       
@@ -425,7 +416,7 @@ with tab1:
         st.markdown("---")
         st.markdown("###  AI Predictions")
         
-        predictions = get_predictions(selected_paths, rules_for_prediction, top_n)
+        predictions = get_predictions(selected_paths, algorithm, top_n)
         
         if len(predictions) > 0:
             col1, col2 = st.columns([1, 1])
@@ -469,7 +460,16 @@ with tab1:
                 1. Find all rules where your selected pages match the rule's antecedents
                 2. Score predictions using: `Score = Confidence × (1 + 0.1 × (Lift - 1))`
                 3. Rank by score, excluding pages you've already visited
+                
+                **Sequential:** uses the order of the pages. The pages that followed the last 3, 2 or 1
+                pages visited in the cleaned sessions are ranked by transition probability; pages only
+                seen after a shorter context count for 0.4× per page dropped (back-off).
                 """)
+
+            cache_stats = get_prediction_cache().stats()
+            st.caption(f"Prediction cache: {cache_stats['entries']:,} sessions, "
+                       f"{cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses "
+                       f"(hit rate {cache_stats['hit_rate'] or 0:.0%})")
         else:
             st.warning("🔍 No predictions found. Try selecting different pages.")
             st.info("💡 Try pages like `/history/apollo`, `/shuttle/countdown`, or `/elv`")
@@ -532,6 +532,133 @@ with tab2:
         )
         st.plotly_chart(fig, use_container_width=True)
     
+    # Performance panel: cost of the last mining run and benchmark scaling
+    st.markdown("### ⏱️ Mining Cost")
+    run_metadata = load_run_metadata()
+    
+    if run_metadata:
+        cols = st.columns(len(run_metadata))
+        for col, (name, meta) in zip(cols, run_metadata.items()):
+            with col:
+                st.markdown(f"#### {name}")
+                seconds = meta.get('mining_seconds')
+                own_run = meta.get('executor', 'process') in OWN_RUN_EXECUTORS
+                st.metric("Mining Time" if own_run else "Shared Run Time", f"{seconds:.2f} s" if seconds is not None else "n/a")
+                peak = meta.get('peak_memory_mb')
+                st.metric("Peak Memory", f"{peak:,.0f} MB" if peak is not None else "n/a")
+                st.metric("Input Sessions", f"{meta['input']['transactions']:,}")
+                executor = f" · {meta['executor']} run" if meta.get('executor') else ""
+                st.caption(f"{meta['input']['items']:,} paths · min_support {meta['min_support']} · {meta['created_at']}{executor}")
+        
+        own_runs = {name: meta for name, meta in run_metadata.items() if meta.get('executor', 'process') in OWN_RUN_EXECUTORS}
+        cost = pd.DataFrame({
+            'Algorithm': list(own_runs),
+            'Mining (s)': [meta['mining_seconds'] for meta in own_runs.values()],
+            'Rule Generation (s)': [meta['rules_seconds'] for meta in own_runs.values()],
+            'Peak Memory (MB)': [meta.get('peak_memory_mb') for meta in own_runs.values()],
+        })
+        # Algorithms written by the same shared run: one entry per run
+        shared_runs = {}
+        for name, meta in run_metadata.items():
+            if name not in own_runs:
+                key = (meta['executor'], meta['created_at'], meta.get('mining_seconds'), meta.get('rules_seconds'))
+                shared_runs.setdefault(key, []).append(name)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if len(cost) > 0:
+                fig = go.Figure()
+                fig.add_trace(go.Bar(name='Mining', x=cost['Algorithm'], y=cost['Mining (s)']))
+                fig.add_trace(go.Bar(name='Rule Generation', x=cost['Algorithm'], y=cost['Rule Generation (s)']))
+                fig.update_layout(
+                    barmode='stack',
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color='white'),
+                    title='<b>Run Time (s)</b>',
+                    height=400
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            for (executor, created_at, mining_seconds, rules_seconds), names in shared_runs.items():
+                mining = f"{mining_seconds:.2f} s" if mining_seconds is not None else "n/a"
+                st.caption(f"{', '.join(names)}: written by one {executor} run ({created_at}), {mining} counting and "
+                           f"{rules_seconds:.2f} s generating rules. No algorithm ran on its own, so it is not charted "
+                           f"as a cost per algorithm.")
+        with col2:
+            # Only process runs measure each algorithm on its own
+            measured = cost.dropna(subset=['Peak Memory (MB)'])
+            if len(measured) > 0:
+                fig = px.bar(measured, x='Algorithm', y='Peak Memory (MB)', color='Algorithm', title='<b>Peak Memory (MB)</b>')
+                fig.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color='white'),
+                    showlegend=False,
+                    height=400
+                )
+                st.plotly_chart(fig, use_container_width=True)
+            if len(measured) < len(run_metadata):
+                st.caption("Peak memory is only measured per algorithm when each one runs in a process of its own "
+                           "(`python -m usedAlgorithme --executor process`), not for thread, serial, incremental or streaming runs.")
+        
+        levels = pd.DataFrame([
+            {'Algorithm': name, 'Itemset Size': level['size'], 'Candidates': level['candidates'], 'Frequent': level['frequent']}
+            for name, meta in run_metadata.items() for level in meta['levels']
+        ])
+        fig = go.Figure()
+        # Each algorithm's own frequent itemsets: Apriori leaves out other paths (NA) than FP-Growth and ECLAT (noise)
+        for name, group in levels.groupby('Algorithm', sort=False):
+            fig.add_trace(go.Scatter(name=f'{name} candidates', x=group['Itemset Size'], y=group['Candidates'], mode='lines+markers'))
+            fig.add_trace(go.Scatter(name=f'{name} frequent', x=group['Itemset Size'], y=group['Frequent'],
+                                     mode='lines+markers', line=dict(dash='dash')))
+        fig.update_layout(
+            plot_bgcolor='rgba(0,0,0,0)',
+            paper_bgcolor='rgba(0,0,0,0)',
+            font=dict(color='white'),
+            title='<b>Candidates per Itemset Size</b>',
+            xaxis_title='Itemset size',
+            yaxis_type='log',
+            height=400
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("💡 No run metadata yet: run `python -m usedAlgorithme` to record mining time and memory.")
+    
+    benchmark = load_benchmark_results()
+    if benchmark is not None and len(benchmark) > 0:
+        st.markdown("#### 📈 Scaling (benchmark)")
+        col1, col2 = st.columns(2)
+        with col1:
+            dataset = st.selectbox("Dataset", sorted(benchmark['dataset'].unique()))
+        with col2:
+            supports = sorted(benchmark.loc[benchmark['dataset'] == dataset, 'min_support'].unique(), reverse=True)
+            min_support = st.selectbox("Min support", supports)
+        scaling = benchmark[(benchmark['dataset'] == dataset) & (benchmark['min_support'] == min_support)]
+        scaling = scaling.sort_values('transactions')
+        
+        col1, col2 = st.columns(2)
+        for col, measure, title in [(col1, 'seconds', 'Mining Time (s)'), (col2, 'peak_rss_mb', 'Peak Memory (MB)')]:
+            with col:
+                fig = px.line(scaling, x='transactions', y=measure, color='algorithm', markers=True,
+                              log_x=True, title=f'<b>{title}</b>')
+                fig.update_layout(
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color='white'),
+                    xaxis_title='Sessions',
+                    yaxis_title=title,
+                    height=400
+                )
+                st.plotly_chart(fig, use_container_width=True)
+        
+        fastest = scaling.loc[scaling.groupby('transactions')['seconds'].idxmin(), ['transactions', 'algorithm', 'seconds', 'peak_rss_mb']]
+        st.markdown("**Fastest algorithm per data size**")
+        st.dataframe(
+            fastest.rename(columns={'transactions': 'Sessions', 'algorithm': 'Algorithm', 'seconds': 'Time (s)', 'peak_rss_mb': 'Peak Memory (MB)'}),
+            use_container_width=True,
+            hide_index=True
+        )
+    
     st.markdown("### 🏆 Top Rules Comparison")
     
     col1, col2, col3 = st.columns(3)
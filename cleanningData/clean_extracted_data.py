@@ -8,10 +8,23 @@ Cleans extracted log data by:
 - Limiting path depth to avoid overly specific paths
 - Removing consecutive duplicates
 - Limiting session length for cleaner patterns
+
+The cleaned sessions are also stored as integer path ids (see transactions.py).
+
+Each distinct raw path is normalized once (normalize_path keeps the results
+in a bounded LRU cache); normalize_paths does the same for a whole column
+of paths with vectorized string operations.
 """
 
+import argparse
 import re
 import os
+from functools import lru_cache
+from itertools import islice
+
+import pandas as pd
+
+from cleanningData.transactions import TRANSACTIONS_DIR, TransactionWriter
 
 
 # Paths to filter out - these are static resources or non-meaningful navigation
@@ -50,6 +63,12 @@ MAX_PATH_DEPTH = 3
 # Maximum session length (too long sessions add noise)
 MAX_SESSION_LENGTH = 25
 
+# Number of distinct raw paths whose normalized form is cached
+PATH_CACHE_SIZE = 100_000
+
+# Number of sessions cleaned together in batch mode
+BATCH_SIZE = 50_000
+
 
 def is_noise_path(path):
     """
@@ -151,11 +170,133 @@ def remove_consecutive_duplicates(paths):
     return result
 
 
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def normalize_path(path):
+    """
+    Cleaned, depth-limited form of a raw path, or None if the path is
+    invalid or noise. Results are cached per distinct raw path.
+    """
+    cleaned = clean_path(path)
+    if is_valid_path(cleaned) and not is_noise_path(cleaned):
+        return limit_path_depth(cleaned)
+    return None
+
+
+def normalize_paths(paths, max_depth=MAX_PATH_DEPTH):
+    """
+    Vectorized normalize_path over a column of raw paths.
+    Each distinct path is normalized once with pandas string operations.
+    Returns an object array with None for dropped paths.
+    """
+    codes, uniques = pd.factorize(pd.Series(paths, dtype=object))
+    s = pd.Series(uniques, dtype=object)
+
+    # clean_path: drop query string / fragment, collapse slashes, strip trailing slash
+    s = s.str.replace(r'(?s)[?#].*', '', regex=True)
+    s = s.str.replace(r'/+', '/', regex=True)
+    s = s.str.replace(r'(?s)(?<=.)/\Z', '', regex=True)
+
+    # Replace paths whose basename has an extension by their directory
+    has_slash = s.str.contains('/', regex=False)
+    basename = s.str.replace(r'(?s)^.*/', '', regex=True)
+    dirname = s.str.replace(r'(?s)/[^/]*\Z', '', regex=True)
+    dirname = dirname.where(~(has_slash & (dirname == '')), '/')
+    dirname = dirname.where(has_slash, '')
+    s = s.where(~basename.str.contains('.', regex=False), dirname)
+    s = s.str.replace(r'(?s)(?<=.)/\Z', '', regex=True)
+
+    # is_valid_path
+    stripped = s.str.strip('/')
+    keep = (s != '') & (s != '/') & ~stripped.str.isdigit() & (stripped.str.len() >= 3)
+
+    # is_noise_path
+    trimmed = s.str.strip()
+    keep &= ~(
+        trimmed.isin(NOISE_PATHS)
+        | trimmed.str.startswith(NOISE_PREFIXES)
+        | s.str.lower().str.contains('imagemap', regex=False)
+        | s.str.contains(',', regex=False)
+    )
+
+    # limit_path_depth
+    s = s.str.replace(r'(?s)^((?:[^/]*/){%d}[^/]*)/.*' % max_depth, r'\1', regex=True)
+
+    normalized = s.to_numpy(dtype=object, copy=True)
+    normalized[~keep.to_numpy(dtype=bool)] = None
+    return normalized[codes]
+
+
+def clean_session(paths):
+    """
+    Clean the raw paths of one session: normalize them, drop noise,
+    limit their depth, remove consecutive duplicates and limit the session length.
+    """
+    # Clean each path, filter out noise and apply path depth limiting
+    cleaned_paths = []
+    for path in paths:
+        cleaned = normalize_path(path)
+        if cleaned is not None:
+            cleaned_paths.append(cleaned)
+    
+    return finish_session(cleaned_paths)
+
+
+def finish_session(cleaned_paths):
+    """
+    Remove consecutive duplicates and limit the length of a session of normalized paths.
+    """
+    # Remove consecutive duplicates (after depth limiting, more may become duplicates)
+    cleaned_paths = remove_consecutive_duplicates(cleaned_paths)
+    
+    # Limit session length to avoid overly long sessions
+    if len(cleaned_paths) > MAX_SESSION_LENGTH:
+        cleaned_paths = cleaned_paths[:MAX_SESSION_LENGTH]
+    
+    return cleaned_paths
+
+
+def clean_sessions(sessions):
+    """
+    Batch version of clean_session: normalizes the paths of many sessions
+    at once with normalize_paths.
+    """
+    lengths = [len(paths) for paths in sessions]
+    flat = [path for paths in sessions for path in paths]
+    normalized = normalize_paths(flat) if flat else []
+
+    cleaned_sessions = []
+    start = 0
+    for length in lengths:
+        cleaned_paths = [p for p in normalized[start:start + length] if p is not None]
+        cleaned_sessions.append(finish_session(cleaned_paths))
+        start += length
+    return cleaned_sessions
+
+
+def read_sessions(infile):
+    """
+    Yield the raw paths of every session line of extracted_logs.csv.
+    """
+    for line in infile:
+        line = line.strip()
+        if not line:
+            continue
+        
+        # Split the line into paths
+        yield line.split(',')
+
+
 def main():
     """
     Main function to clean extracted log data.
     Reads from extracted_logs.csv and writes to cleaned_data.csv
+    and the transactions/ arrays
     """
+    parser = argparse.ArgumentParser(description="Clean extracted sessions.")
+    parser.add_argument('--batch', action='store_true',
+                        help=f"Normalize paths {BATCH_SIZE:,} sessions at a time with vectorized string operations")
+    args = parser.parse_args()
+
     input_file = 'Data/extractedAndcleanedData/extracted_logs.csv'
     output_file = 'Data/extractedAndcleanedData/cleaned_data.csv'
     
@@ -163,47 +304,36 @@ def main():
     
     total_sessions = 0
     total_paths = 0
+    transactions = TransactionWriter()
     
     try:
         with open(input_file, 'r') as infile, open(output_file, 'w') as outfile:
-            for line in infile:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # Split the line into paths
-                paths = line.split(',')
-                
-                # Clean each path and filter out noise
-                cleaned_paths = []
-                for path in paths:
-                    cleaned = clean_path(path)
-                    if is_valid_path(cleaned) and not is_noise_path(cleaned):
-                        # Apply path depth limiting
-                        cleaned = limit_path_depth(cleaned)
-                        cleaned_paths.append(cleaned)
-                
-                # Remove consecutive duplicates (after depth limiting, more may become duplicates)
-                cleaned_paths = remove_consecutive_duplicates(cleaned_paths)
-                
-                # Limit session length to avoid overly long sessions
-                if len(cleaned_paths) > MAX_SESSION_LENGTH:
-                    cleaned_paths = cleaned_paths[:MAX_SESSION_LENGTH]
-                
+            sessions = read_sessions(infile)
+            if args.batch:
+                batches = iter(lambda: list(islice(sessions, BATCH_SIZE)), [])
+                cleaned = (paths for batch in batches for paths in clean_sessions(batch))
+            else:
+                cleaned = (clean_session(paths) for paths in sessions)
+            
+            for cleaned_paths in cleaned:
                 # Only keep sessions with at least 2 paths
                 if len(cleaned_paths) >= 2:
                     outfile.write(",".join(cleaned_paths) + '\n')
+                    transactions.add(cleaned_paths)
                     total_sessions += 1
                     total_paths += len(cleaned_paths)
         
+        transactions.save(TRANSACTIONS_DIR, source=output_file)
+        
         print(f"Done!")
         print(f"  - Total sessions: {total_sessions}")
         print(f"  - Total paths: {total_paths}")
+        print(f"  - Distinct paths: {len(transactions.paths)}")
         if total_sessions > 0:
             print(f"  - Average paths per session: {total_paths / total_sessions:.2f}")
             
     except FileNotFoundError:
-        print(f"Error: {input_file} not found. Run extract_logs.py first.")
+        print(f"Error: {input_file} not found. Run extract_logs first.")
 
 
 if __name__ == "__main__":
@@ -1,68 +1,344 @@
 
+import argparse
+import bz2
+import calendar
+import gzip
+import io
+import lzma
+import os
 import re
+from collections import OrderedDict, deque
+from functools import lru_cache
+from itertools import islice
+from multiprocessing import Pool
+
+# Match GET requests and extract host, path, and status
+LOG_PATTERN = re.compile(r'^(\S+) .* "GET (.*?) HTTP.*" (\d{3})')
+
+# Same as LOG_PATTERN, also capturing the request timestamp
+# e.g. 199.72.81.55 - - [01/Jul/1995:00:00:01 -0400] "GET /history/apollo/ HTTP/1.0" 200 6245
+TIMED_LOG_PATTERN = re.compile(
+    r'^(\S+) .*?\[(\d{2})/(\w{3})/(\d{4}):(\d{2}):(\d{2}):(\d{2})[^\]]*\] "GET (.*?) HTTP.*" (\d{3})'
+)
+
+MONTHS = {
+    'Jan': 1, 'Feb': 2, 'Mar': 3, 'Apr': 4, 'May': 5, 'Jun': 6,
+    'Jul': 7, 'Aug': 8, 'Sep': 9, 'Oct': 10, 'Nov': 11, 'Dec': 12,
+}
+
+# Requests from a host more than this many seconds apart start a new session
+SESSION_TIMEOUT = 30 * 60
+
+# Size of the byte ranges handed to each worker in parallel mode
+CHUNK_SIZE = 64 * 1024 * 1024
+
+# Compressed log formats, read as a stream
+COMPRESSED_OPENERS = {
+    '.gz': gzip.open,
+    '.bz2': bz2.open,
+    '.xz': lzma.open,
+}
+
+DEFAULT_LOG_FILES = ['Data/Logs/access_log_Aug95']
+
+
+def is_compressed(filename):
+    return os.path.splitext(filename)[1] in COMPRESSED_OPENERS
+
+
+def open_log(filename):
+    """Open a plain or compressed (.gz, .bz2, .xz) log file as text."""
+    opener = COMPRESSED_OPENERS.get(os.path.splitext(filename)[1], open)
+    return opener(filename, 'rt', encoding='utf-8', errors='ignore')
+
+
+def parse_lines(lines, sessions, limit=None):
+    """
+    Add the successful GET requests of an iterable of log lines to sessions
+    (host -> list of paths). Returns the number of GET requests matched.
+    """
+    count = 0
+    for line in lines:
+        if limit is not None and count >= limit:
+            break
+
+        match = LOG_PATTERN.match(line)
+
+        if match:
+            host = match.group(1)
+            path = match.group(2)
+            status = int(match.group(3))
+
+            count += 1
+
+            # Skip error responses (4xx and 5xx)
+            if status >= 400:
+                continue
+
+            if host not in sessions:
+                sessions[host] = []
+            sessions[host].append(path)
+    return count
+
+
+@lru_cache(maxsize=4096)
+def _day_start(day, month, year):
+    """Epoch seconds at the start of a log date (the timezone offset is ignored)"""
+    return calendar.timegm((int(year), MONTHS[month], int(day), 0, 0, 0))
+
+
+def parse_requests(lines):
+    """
+    Yield (host, timestamp, path) for every successful GET request
+    in an iterable of log lines, timestamp in seconds.
+    """
+    for line in lines:
+        match = TIMED_LOG_PATTERN.match(line)
+        if not match:
+            continue
+
+        host, day, month, year, hours, minutes, seconds, path, status = match.groups()
+
+        # Skip error responses (4xx and 5xx) and unreadable dates
+        if int(status) >= 400 or month not in MONTHS:
+            continue
+
+        timestamp = _day_start(day, month, year) + int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+        yield host, timestamp, path
+
 
 def process_log_file(filename, limit=None):
- 
+
     sessions = {}
     try:
-        with open(filename, 'r', encoding='utf-8', errors='ignore') as f:
-            count = 0
-            for line in f:
-                if limit is not None and count >= limit:
-                    break
-                
-                # Match GET requests and extract host, path, and status
-                match = re.match(r'^(\S+) .* "GET (.*?) HTTP.*" (\d{3})', line)
-                
-                if match:
-                    host = match.group(1)
-                    path = match.group(2)
-                    status = int(match.group(3))
-                    
-                    count += 1
-                    
-                    # Skip error responses (4xx and 5xx)
-                    if status >= 400:
-                        continue
-                    
-                    if host not in sessions:
-                        sessions[host] = []
-                    sessions[host].append(path)
-                    
+        with open_log(filename) as f:
+            parse_lines(f, sessions, limit)
+
     except FileNotFoundError:
         print(f"Error: File {filename} not found.")
     return sessions
 
 
-def main():
-  
-    files = ['Data/Logs/access_log_Aug95']  # Fixed: was duplicated
-    output_file = 'Data/extractedAndcleanedData/extracted_logs.csv'
+def split_into_chunks(filename, chunk_size=CHUNK_SIZE):
+    """
+    Split a file into (start, end) byte ranges that begin and end on line boundaries.
+    """
+    file_size = os.path.getsize(filename)
+    chunks = []
+    with open(filename, 'rb') as f:
+        start = 0
+        while start < file_size:
+            f.seek(min(start + chunk_size, file_size))
+            f.readline()
+            end = min(f.tell(), file_size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def _process_chunk(args):
+    """Worker: parse one byte range of a log file into partial sessions."""
+    filename, start, end = args
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    # Same decoding and newline handling as reading the file in text mode
+    lines = io.StringIO(data.decode('utf-8', errors='ignore'), newline=None)
+    sessions = {}
+    parse_lines(lines, sessions)
+    return sessions
+
+
+def _process_chunk_requests(args):
+    """Worker: parse one byte range of a log file into timestamped requests."""
+    filename, start, end = args
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    lines = io.StringIO(data.decode('utf-8', errors='ignore'), newline=None)
+    return list(parse_requests(lines))
+
+
+def iter_requests(filename, workers=1, chunk_size=CHUNK_SIZE):
+    """
+    Yield the (host, timestamp, path) requests of a log file in file order,
+    parsing byte ranges in a process pool when workers > 1.
+    At most 2 x workers chunks are parsed ahead of the consumer, so parsed
+    requests do not pile up when sessionizing is slower than parsing.
+    Compressed files cannot be split and are always read as one stream.
+    """
+    if workers > 1 and not is_compressed(filename):
+        with Pool(workers) as pool:
+            tasks = iter([(filename, start, end) for start, end in split_into_chunks(filename, chunk_size)])
+            pending = deque(pool.apply_async(_process_chunk_requests, (task,))
+                            for task in islice(tasks, workers * 2))
+            while pending:
+                requests = pending.popleft().get()
+                for task in islice(tasks, 1):
+                    pending.append(pool.apply_async(_process_chunk_requests, (task,)))
+                yield from requests
+                del requests
+    else:
+        with open_log(filename) as f:
+            yield from parse_requests(f)
+
+
+class Sessionizer:
+    """
+    Splits each host's requests into sessions separated by more than
+    `timeout` seconds of inactivity.
+    A session is passed to `emit` as soon as a later request shows it has
+    expired, so only the currently active hosts are kept in memory.
+    """
+
+    def __init__(self, emit, timeout=SESSION_TIMEOUT):
+        self.emit = emit
+        self.timeout = timeout
+        # host -> [last request time, paths], least recently active first
+        self.active = OrderedDict()
+        self.peak_active = 0
+
+    def add(self, host, timestamp, path):
+        # Flush every session idle for longer than the timeout
+        while self.active:
+            oldest_host, (last_seen, paths) = next(iter(self.active.items()))
+            if timestamp - last_seen <= self.timeout:
+                break
+            del self.active[oldest_host]
+            self.emit(paths)
+
+        session = self.active.get(host)
+        if session is not None and timestamp - session[0] > self.timeout:
+            # Only reachable with out-of-order timestamps
+            del self.active[host]
+            self.emit(session[1])
+            session = None
+
+        if session is None:
+            session = [timestamp, []]
+            self.active[host] = session
+            self.peak_active = max(self.peak_active, len(self.active))
+        else:
+            self.active.move_to_end(host)
+
+        session[0] = max(session[0], timestamp)
+        session[1].append(path)
+
+    def flush(self):
+        """Emit all sessions still open (end of input)."""
+        for _, paths in self.active.values():
+            self.emit(paths)
+        self.active.clear()
+
+
+class SessionWriter:
+    """Writes sessions of at least 2 paths, one comma-separated line each."""
+
+    def __init__(self, f):
+        self.f = f
+        self.total_sessions = 0
+        self.total_paths = 0
+
+    def write(self, paths):
+        if paths and len(paths) >= 2:
+            self.f.write(",".join(paths) + '\n')
+            self.total_sessions += 1
+            self.total_paths += len(paths)
+
+
+def process_log_file_parallel(filename, workers=None, chunk_size=CHUNK_SIZE):
+    """
+    Parallel version of process_log_file.
+    The file is split into line-aligned byte ranges parsed in a process pool;
+    partial sessions are merged in file order, so hosts and paths come out
+    in the same order as with process_log_file.
+    Compressed files cannot be split and are read by process_log_file.
+    """
+    if is_compressed(filename):
+        return process_log_file(filename)
+
+    sessions = {}
+    try:
+        chunks = split_into_chunks(filename, chunk_size)
+    except FileNotFoundError:
+        print(f"Error: File {filename} not found.")
+        return sessions
+
+    with Pool(workers) as pool:
+        tasks = [(filename, start, end) for start, end in chunks]
+        for partial in pool.imap(_process_chunk, tasks):
+            for host, paths in partial.items():
+                if host not in sessions:
+                    sessions[host] = []
+                sessions[host].extend(paths)
+    return sessions
+
+
+def extract_sessions(files, emit, workers=1, session_timeout=SESSION_TIMEOUT):
+    """
+    Pass every session found in the log files to emit (a list of paths each).
+    With a session_timeout (seconds) sessions are emitted as soon as they expire;
+    with 0 each host is one session, emitted once all files are read.
+    """
+    if session_timeout > 0:
+        sessionizer = Sessionizer(emit, session_timeout)
+        for filename in files:
+            print(f"Processing {filename}...")
+            try:
+                for host, timestamp, path in iter_requests(filename, workers):
+                    sessionizer.add(host, timestamp, path)
+            except FileNotFoundError:
+                print(f"Error: File {filename} not found.")
+        sessionizer.flush()
+        print(f"  - Peak active hosts: {sessionizer.peak_active}")
+        return
+
     all_sessions = {}
 
     for filename in files:
         print(f"Processing {filename}...")
-        file_sessions = process_log_file(filename)
-        
+        if workers > 1:
+            file_sessions = process_log_file_parallel(filename, workers)
+        else:
+            file_sessions = process_log_file(filename)
+
         # Merge sessions from multiple files
         for host, paths in file_sessions.items():
             if host not in all_sessions:
                 all_sessions[host] = []
             all_sessions[host].extend(paths)
 
+    for paths in all_sessions.values():
+        emit(paths)
+
+
+def add_extraction_arguments(parser):
+    """Command line options shared by the extraction scripts."""
+    parser.add_argument('files', nargs='*', default=DEFAULT_LOG_FILES,
+                        help="Access log files, plain or .gz/.bz2/.xz")
+    parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                        help="Number of parsing processes (1 = single process)")
+    parser.add_argument('--session-timeout', type=float, default=SESSION_TIMEOUT / 60,
+                        help="Minutes of inactivity that end a session (0 = one session per host)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract user sessions from access logs.")
+    add_extraction_arguments(parser)
+    args = parser.parse_args()
+
+    output_file = 'Data/extractedAndcleanedData/extracted_logs.csv'
+
     print(f"Writing raw sessions to {output_file}...")
-    
-    total_sessions = 0
-    total_paths = 0
-    
     with open(output_file, 'w') as f:
-        for host, paths in all_sessions.items():
-            if paths and len(paths) >= 2:
-                line = ",".join(paths)
-                f.write(line + '\n')
-                total_sessions += 1
-                total_paths += len(paths)
-    
+        writer = SessionWriter(f)
+        extract_sessions(args.files, writer.write, args.workers, args.session_timeout * 60)
+
+    total_sessions = writer.total_sessions
+    total_paths = writer.total_paths
+
     print(f"Done!")
     print(f"  - Total sessions: {total_sessions}")
     print(f"  - Total paths: {total_paths}")
@@ -0,0 +1,69 @@
+"""
+pipeline.py
+Single-pass extraction and cleaning:
+- Reads any number of access logs, plain or compressed (.gz, .bz2, .xz), as a stream
+- Splits requests into sessions (see extract_logs)
+- Cleans each session inline (see clean_extracted_data)
+- Writes cleaned transactions directly, without the intermediate extracted_logs.csv,
+  both as text and as integer path id arrays (see transactions.py)
+
+Output is the same as running extract_logs.py then clean_extracted_data.py.
+
+Usage (from the project root):
+    python -m cleanningData.pipeline Data/Logs/access_log_Jul95.gz Data/Logs/access_log_Aug95.gz
+"""
+
+import argparse
+
+from cleanningData.clean_extracted_data import clean_session
+from cleanningData.extract_logs import SessionWriter, add_extraction_arguments, extract_sessions
+from cleanningData.transactions import TRANSACTIONS_DIR, TransactionWriter
+
+
+class CleanedSessionWriter(SessionWriter):
+    """Cleans each raw session before writing it."""
+
+    def __init__(self, f):
+        super().__init__(f)
+        self.transactions = TransactionWriter()
+
+    def write(self, paths):
+        # Same splitting as reading the session back from extracted_logs.csv
+        raw_paths = ",".join(paths).strip()
+        if not raw_paths:
+            return
+
+        cleaned_paths = clean_session(raw_paths.split(','))
+        if len(cleaned_paths) >= 2:
+            super().write(cleaned_paths)
+            self.transactions.add(cleaned_paths)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract and clean user sessions from access logs in one pass.")
+    add_extraction_arguments(parser)
+    parser.add_argument('--output', default='Data/extractedAndcleanedData/cleaned_data.csv',
+                        help="Cleaned transactions file")
+    parser.add_argument('--transactions', default=TRANSACTIONS_DIR,
+                        help="Directory of the integer transaction arrays")
+    args = parser.parse_args()
+
+    print(f"Writing cleaned sessions to {args.output}...")
+    with open(args.output, 'w') as f:
+        writer = CleanedSessionWriter(f)
+        extract_sessions(args.files, writer.write, args.workers, args.session_timeout * 60)
+    writer.transactions.save(args.transactions, source=args.output)
+
+    total_sessions = writer.total_sessions
+    total_paths = writer.total_paths
+
+    print(f"Done!")
+    print(f"  - Total sessions: {total_sessions}")
+    print(f"  - Total paths: {total_paths}")
+    print(f"  - Distinct paths: {len(writer.transactions.paths)}")
+    if total_sessions > 0:
+        print(f"  - Average paths per session: {total_paths / total_sessions:.2f}")
+
+
+if __name__ == "__main__":
+    main()
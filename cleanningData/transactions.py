@@ -0,0 +1,152 @@
+"""
+transactions.py
+Array-backed storage for cleaned sessions:
+- A path dictionary (paths.txt): line i is the path with id i
+- offsets.npy (int64): session i is items[offsets[i]:offsets[i + 1]]
+- items.npy (int32): path ids of every session, in visit order
+
+The files are written next to cleaned_data.csv by the cleaning scripts and
+loaded with np.load(mmap_mode='r'), so large months never need to be held
+as Python strings. source.json records the CSV they were written with (name,
+size, modification time), so that they are only used in place of that file.
+"""
+
+import json
+import os
+from array import array
+
+import numpy as np
+
+
+TRANSACTIONS_DIR = 'Data/extractedAndcleanedData/transactions'
+PATHS_FILE = 'paths.txt'
+OFFSETS_FILE = 'offsets.npy'
+ITEMS_FILE = 'items.npy'
+SOURCE_FILE = 'source.json'
+
+
+def read_paths(directory):
+    """Path dictionary of a transactions (or rule store) directory"""
+    with open(os.path.join(directory, PATHS_FILE), encoding='utf-8') as f:
+        return f.read().splitlines()
+
+
+def write_paths(directory, paths):
+    with open(os.path.join(directory, PATHS_FILE), 'w', encoding='utf-8') as f:
+        for path in paths:
+            f.write(path + '\n')
+
+
+def source_signature(filename):
+    """Name, size and modification time of a sessions file"""
+    stat = os.stat(filename)
+    return {'file': os.path.basename(filename), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def written_from(directory, filename):
+    """Whether the arrays of directory were written with filename, as it is now"""
+    try:
+        with open(os.path.join(directory, SOURCE_FILE)) as f:
+            return json.load(f) == source_signature(filename)
+    except (OSError, ValueError):
+        return False
+
+
+class TransactionWriter:
+    """
+    Builds the path dictionary and the CSR arrays while sessions are written.
+    """
+
+    def __init__(self, paths=None):
+        self.paths = list(paths) if paths is not None else []
+        self.path_ids = {path: i for i, path in enumerate(self.paths)}
+        self.offsets = array('q', [0])
+        self.items = array('i')
+
+    def path_id(self, path):
+        path_id = self.path_ids.get(path)
+        if path_id is None:
+            path_id = len(self.paths)
+            self.path_ids[path] = path_id
+            self.paths.append(path)
+        return path_id
+
+    def add(self, session):
+        self.items.extend(self.path_id(path) for path in session)
+        self.offsets.append(len(self.items))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def save(self, directory=TRANSACTIONS_DIR, source=None):
+        """Write the arrays; source: the (closed) CSV the same sessions were written to"""
+        os.makedirs(directory, exist_ok=True)
+        write_paths(directory, self.paths)
+        np.save(os.path.join(directory, OFFSETS_FILE), np.frombuffer(self.offsets, dtype=np.int64))
+        np.save(os.path.join(directory, ITEMS_FILE), np.frombuffer(self.items, dtype=np.int32))
+        source_file = os.path.join(directory, SOURCE_FILE)
+        if source is not None:
+            with open(source_file, 'w') as f:
+                json.dump(source_signature(source), f)
+        elif os.path.exists(source_file):
+            os.remove(source_file)
+
+
+class Transactions:
+    """
+    Sessions as a CSR pair of arrays (offsets, items) plus the path dictionary.
+    """
+
+    def __init__(self, offsets, items, paths):
+        self.offsets = offsets
+        self.items = items
+        self.paths = paths
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """Path ids of session i"""
+        return self.items[self.offsets[i]:self.offsets[i + 1]]
+
+    @property
+    def n_items(self):
+        return len(self.paths)
+
+    def session_ids(self):
+        """Session index of every entry of items"""
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+
+    def unique(self):
+        """
+        Same sessions with each path kept once, ids sorted (the item sets mined
+        by Apriori, FP-Growth and ECLAT).
+        """
+        rows = self.session_ids()
+        items = np.asarray(self.items)
+        order = np.lexsort((items, rows))
+        rows, items = rows[order], items[order]
+        keep = np.ones(len(items), dtype=bool)
+        keep[1:] = (rows[1:] != rows[:-1]) | (items[1:] != items[:-1])
+        rows, items = rows[keep], items[keep]
+        offsets = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(self)), out=offsets[1:])
+        return Transactions(offsets, items, self.paths)
+
+    def to_lists(self):
+        """Sessions as lists of path strings"""
+        paths = np.asarray(self.paths, dtype=object)
+        return [list(paths[self[i]]) for i in range(len(self))]
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        write_paths(directory, self.paths)
+        np.save(os.path.join(directory, OFFSETS_FILE), np.asarray(self.offsets, dtype=np.int64))
+        np.save(os.path.join(directory, ITEMS_FILE), np.asarray(self.items, dtype=np.int32))
+
+
+def load_transactions(directory=TRANSACTIONS_DIR, mmap_mode='r'):
+    """Memory-map the transactions written by the cleaning scripts."""
+    offsets = np.load(os.path.join(directory, OFFSETS_FILE), mmap_mode=mmap_mode)
+    items = np.load(os.path.join(directory, ITEMS_FILE), mmap_mode=mmap_mode)
+    return Transactions(offsets, items, read_paths(directory))
@@ -0,0 +1,10 @@
+"""
+Next-page prediction from the mined association rules and the sequence model.
+"""
+
+from .rule_index import RuleIndex, score_rules
+from .sequence_index import SequenceIndex
+from .cache import PredictionCache
+from .engine import (RULE_FILES, SEQUENCE_ALGORITHM, SEQUENCE_MODEL, PredictionEngine, load_rule_sets,
+                     load_sequence_index, rules_signature)
+from .batch import PredictionStore, score_sessions
@@ -0,0 +1,208 @@
+"""
+batch.py
+Offline scoring of whole session files against a rule set (to precompute
+recommendations or measure hit rates):
+- Reads the sessions like the mining code (the transactions/ arrays next to
+  the CSV when they were written with it, the CSV otherwise)
+- Scores them in chunks with RuleIndex.top_pages_matrix: a sparse
+  sessions x pages matrix times the pages x rules antecedent matrix, instead
+  of one prediction per session
+- Chunks are spread over a process pool (each worker gets the index once),
+  at most 2 x workers chunks in flight, so the sessions are not all copied
+  into the task queue at once
+- Writes the top-N predictions of every session as a columnar store: CSR
+  offsets per session, then page ids, rule rows and metrics, one .npy file
+  per column (memory-mapped by PredictionStore)
+
+The predictions of a session are those of PredictionEngine.predict(), in the
+same order.
+
+Usage (from the project root):
+    python -m prediction.batch Data/extractedAndcleanedData/cleaned_data.csv --algorithm ECLAT --top-n 10
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+from cleanningData.transactions import read_paths, write_paths
+from usedAlgorithme.mining import CLEANED_DATA, load_transactions
+
+from .engine import PredictionEngine, algorithm_key
+from .rule_index import RuleIndex
+
+
+OUTPUT_ROOT = 'Data/predictions'
+META_FILE = 'store.json'
+STORE_VERSION = 1
+METRICS = ['confidence', 'lift', 'support', 'score']
+
+# Rule index of a process worker
+_index = None
+
+
+def index_sessions(lookup, transactions, start=0, stop=None):
+    """
+    Sessions start..stop of a Transactions as CSR arrays (offsets, items) of
+    index path ids (lookup: index id of every transactions path, see
+    RuleIndex.path_ids); pages the rules never mention are left out.
+    """
+    stop = len(transactions) if stop is None else min(stop, len(transactions))
+    offsets = np.asarray(transactions.offsets[start:stop + 1], dtype=np.int64)
+    items = lookup[np.asarray(transactions.items[offsets[0]:offsets[-1]])]
+    known = np.concatenate(([0], np.cumsum(items >= 0)))
+    return known[offsets - offsets[0]], items[items >= 0]
+
+
+def score_chunk(index, offsets, items, top_n):
+    """Top pages of a chunk of sessions: (predictions per session, pages, rules)"""
+    sessions, pages, rules = index.top_pages_matrix(index.session_matrix(offsets, items), top_n)
+    counts = np.bincount(sessions, minlength=len(offsets) - 1)
+    return counts, pages.astype(np.int32), rules
+
+
+def _init_worker(index):
+    global _index
+    _index = index
+
+
+def _score_in_worker(args):
+    offsets, items, top_n = args
+    return score_chunk(_index, offsets, items, top_n)
+
+
+def score_sessions(index, transactions, top_n=10, chunk_size=20_000, workers=None):
+    """
+    Top-N predictions of every session of a Transactions.
+    workers: processes of the pool (None: one per CPU, 1: no pool).
+    Returns (offsets per session, page ids, rule ids).
+    """
+    lookup = index.path_ids(transactions.paths)
+    chunks = ((*index_sessions(lookup, transactions, start, start + chunk_size), top_n)
+              for start in range(0, len(transactions), chunk_size))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(transactions) <= chunk_size:
+        results = [score_chunk(index, *chunk) for chunk in chunks]
+    else:
+        results = []
+        with Pool(workers, initializer=_init_worker, initargs=(index,)) as pool:
+            # Results come back in chunk order; a chunk is only sent when one is collected
+            pending = deque(pool.apply_async(_score_in_worker, (chunk,)) for chunk in islice(chunks, workers * 2))
+            while pending:
+                results.append(pending.popleft().get())
+                for chunk in islice(chunks, 1):
+                    pending.append(pool.apply_async(_score_in_worker, (chunk,)))
+
+    offsets = np.zeros(len(transactions) + 1, dtype=np.int64)
+    if results:
+        np.cumsum(np.concatenate([counts for counts, _, _ in results]), out=offsets[1:])
+        pages = np.concatenate([pages for _, pages, _ in results])
+        rules = np.concatenate([rules for _, _, rules in results])
+    else:
+        pages, rules = np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+    return offsets, pages, rules
+
+
+def save_predictions(directory, index, offsets, pages, rules, metadata=None):
+    """Write scored sessions as a prediction store (metrics as float32)"""
+    os.makedirs(directory, exist_ok=True)
+    write_paths(directory, index.paths)
+    np.save(os.path.join(directory, 'offsets.npy'), offsets)
+    np.save(os.path.join(directory, 'pages.npy'), pages.astype(np.int32))
+    # Rows of the rules export, so that the rules themselves can be looked up
+    np.save(os.path.join(directory, 'rules.npy'), index.rows[rules].astype(np.int32))
+    for metric in METRICS:
+        np.save(os.path.join(directory, f'{metric}.npy'), getattr(index, metric)[rules].astype(np.float32))
+    with open(os.path.join(directory, META_FILE), 'w') as f:
+        json.dump({'version': STORE_VERSION, 'sessions': len(offsets) - 1, 'predictions': len(pages),
+                   **(metadata or {})}, f, indent=1)
+
+
+class PredictionStore:
+    """
+    Memory-mapped view of a prediction store.
+    Session i's predictions are rows offsets[i]:offsets[i + 1] of every column.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            self.metadata = json.load(f)
+        if self.metadata.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported prediction store version in {directory}: {self.metadata.get('version')}")
+        self.paths = read_paths(directory)
+        self.offsets = self._load('offsets.npy')
+        self.pages = self._load('pages.npy')
+        self.rules = self._load('rules.npy')
+
+    def _load(self, name):
+        return np.load(os.path.join(self.directory, name), mmap_mode='r')
+
+    def metric(self, name):
+        return self._load(f'{name}.npy')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        """Predicted paths of session i, best first"""
+        return [self.paths[p] for p in self.pages[self.offsets[i]:self.offsets[i + 1]]]
+
+    def to_frame(self):
+        """One row per prediction: session, rank, page, rule row and metrics"""
+        counts = np.diff(self.offsets)
+        sessions = np.repeat(np.arange(len(self)), counts)
+        data = {
+            'session': sessions,
+            'rank': np.arange(len(self.pages)) - np.repeat(self.offsets[:-1], counts) + 1,
+            'page': np.asarray(self.paths, dtype=object)[np.asarray(self.pages)],
+            'rule': np.asarray(self.rules),
+        }
+        for metric in METRICS:
+            data[metric] = np.asarray(self.metric(metric))
+        return pd.DataFrame(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score every session of a file against a rule set.")
+    parser.add_argument('input', nargs='?', default=CLEANED_DATA, help="Cleaned sessions file")
+    parser.add_argument('--algorithm', default='ECLAT', help="Apriori, FP-Growth or ECLAT")
+    parser.add_argument('--top-n', type=int, default=10)
+    parser.add_argument('--root', default='.', help="Project root holding the Data/ rule exports")
+    parser.add_argument('--output', default=None, help=f"Store directory (default: {OUTPUT_ROOT}/<algorithm>)")
+    parser.add_argument('--chunk-size', type=int, default=20_000, help="Sessions per chunk")
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    engine = PredictionEngine.from_files(args.root)
+    index = engine.index(args.algorithm)
+    if not isinstance(index, RuleIndex):
+        parser.error(f"{engine.name(args.algorithm)} is not a rule set: batch scoring needs Apriori, FP-Growth or ECLAT")
+    transactions = load_transactions(args.input)
+    loaded = time.perf_counter()
+
+    offsets, pages, rules = score_sessions(index, transactions, args.top_n, args.chunk_size, args.workers)
+    scored = time.perf_counter()
+
+    output = args.output or os.path.join(OUTPUT_ROOT, algorithm_key(args.algorithm))
+    save_predictions(output, index, offsets, pages, rules, {
+        'algorithm': engine.name(args.algorithm),
+        'source': args.input,
+        'top_n': args.top_n,
+    })
+    with_predictions = int((np.diff(offsets) > 0).sum())
+    print(f"Loaded {len(index):,} rules and {len(transactions):,} sessions in {loaded - started:.2f}s")
+    print(f"Scored in {scored - loaded:.2f}s: {with_predictions:,} sessions with predictions, "
+          f"{len(pages):,} predictions -> {output}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+cache.py
+Bounded cache of prediction results:
+- LRU: the least recently used entry is evicted first
+- Entries expire after ttl seconds
+- Bounded both in entries and in (estimated) bytes
+- invalidate(signature) clears it when the rule files it was filled from
+  change (see engine.rules_signature)
+- Counts hits, misses, evictions, expirations and invalidations (stats())
+
+Keys and values are up to the caller; PredictionEngine keys on (kind,
+algorithm, sorted page ids of the session) and stores the full ranked list,
+so that any top_n is cut from one entry. Thread-safe: the dashboard and the
+HTTP service call it from several threads.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_TTL = 600
+DEFAULT_MAX_BYTES = 64 << 20
+
+
+def estimate_size(value):
+    """Approximate memory of a cached value in bytes (frames, lists of dicts, scalars)"""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class PredictionCache:
+    """LRU cache with a time to live and a memory cap."""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, max_bytes=DEFAULT_MAX_BYTES,
+                 clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.signature = None
+        self.bytes = 0
+        # key -> (value, expires at, size), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Cached value of key, None when missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            value, expires_at, size = entry
+            if self.ttl is not None and self.clock() >= expires_at:
+                del self._entries[key]
+                self.bytes -= size
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = estimate_size(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # Would evict everything else
+            return
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[2]
+            self._entries[key] = (value, expires_at, size)
+            self.bytes += size
+            while len(self._entries) > self.max_entries or \
+                    (self.max_bytes is not None and self.bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def invalidate(self, signature):
+        """Clear the cache if it was filled from other rule files than signature's. Returns whether it was."""
+        with self._lock:
+            if signature == self.signature:
+                return False
+            changed = self.signature is not None
+            self.signature = signature
+            if changed:
+                self._entries.clear()
+                self.bytes = 0
+                self.invalidations += 1
+            return changed
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
@@ -0,0 +1,159 @@
+"""
+engine.py
+Next-page prediction for every algorithm, usable outside of the dashboard:
+- Loads the Apriori, FP-Growth and ECLAT rule sets once (binary stores or
+  CSV exports, see rule_store) and builds one RuleIndex per algorithm
+- Loads the sequence model (usedAlgorithme/sequences.py) as a fourth
+  algorithm, 'Sequential', when it was built
+- Algorithm names are matched loosely ('FP-Growth', 'fp_growth', 'fpgrowth')
+- predict() returns the top pages as plain dicts (the fast path, used by the
+  HTTP service), predict_frame() the dashboard's prediction frame and
+  predict_batch() the top pages of many sessions
+- With a PredictionCache, the full ranked predictions of a session are
+  cached per algorithm and set of known pages, and any top_n is cut from
+  them; the cache is cleared when the rule files change (rules_signature)
+"""
+
+import os
+
+from usedAlgorithme.rule_store import META_FILE, load_frame, store_path
+from usedAlgorithme.sequences import META_FILE as MODEL_META_FILE
+
+from .rule_index import RuleIndex
+from .sequence_index import SequenceIndex
+
+
+# Rules export of each algorithm, relative to the project root
+RULE_FILES = {
+    'Apriori': 'Data/apriori/apriori_rules.csv',
+    'FP-Growth': 'Data/fp_growth/fp_rules.csv',
+    'ECLAT': 'Data/ECLAT/ECLAT_rules.csv',
+}
+
+# Markov model of the ordered sessions, relative to the project root
+SEQUENCE_MODEL = 'Data/sequences/markov'
+SEQUENCE_ALGORITHM = 'Sequential'
+
+
+def algorithm_key(name):
+    """Name of an algorithm without case and punctuation"""
+    return ''.join(c for c in str(name).lower() if c.isalnum())
+
+
+def load_rule_sets(root='.', rule_files=RULE_FILES):
+    """{algorithm: rules frame} of the exports found under root (missing ones are skipped)"""
+    rule_sets = {}
+    for name, path in rule_files.items():
+        try:
+            rule_sets[name] = load_frame(os.path.join(root, path))
+        except FileNotFoundError:
+            continue
+    return rule_sets
+
+
+def load_sequence_index(root='.', directory=SEQUENCE_MODEL):
+    """SequenceIndex of the Markov model under root, None when it was not built"""
+    directory = os.path.join(root, directory)
+    if not os.path.exists(os.path.join(directory, MODEL_META_FILE)):
+        return None
+    return SequenceIndex.load(directory)
+
+
+def rules_signature(root='.', rule_files=RULE_FILES, sequence_model=SEQUENCE_MODEL):
+    """
+    (path, modification time, size) of every rules export, binary store and
+    of the sequence model under root: changes whenever a mining job rewrites them.
+    """
+    files = []
+    for path in rule_files.values():
+        path = os.path.join(root, path)
+        files += [path, os.path.join(store_path(path), META_FILE)]
+    if sequence_model is not None:
+        files.append(os.path.join(root, sequence_model, MODEL_META_FILE))
+
+    signature = []
+    for file in files:
+        try:
+            stat = os.stat(file)
+        except FileNotFoundError:
+            continue
+        signature.append((file, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class PredictionEngine:
+    """
+    One index per algorithm (RuleIndex, SequenceIndex for the sequence model),
+    built once, optionally in front of a PredictionCache.
+    """
+
+    def __init__(self, rule_sets, cache=None, signature=None, indexes=None):
+        """
+        signature: of the rule files the rule sets come from (clears the cache when it changed).
+        indexes: more prebuilt indexes by algorithm name (e.g. the SequenceIndex).
+        """
+        self.indexes = {name: RuleIndex(rules) for name, rules in rule_sets.items()}
+        self.indexes.update(indexes or {})
+        self._names = {algorithm_key(name): name for name in self.indexes}
+        self.cache = cache
+        self.signature = signature
+        # Keeps apart the entries of an engine built from other rule files, while both run
+        self._generation = hash(signature)
+        if cache is not None:
+            cache.invalidate(signature)
+
+    @classmethod
+    def from_files(cls, root='.', rule_files=RULE_FILES, cache=None, sequence_model=SEQUENCE_MODEL):
+        signature = rules_signature(root, rule_files, sequence_model)
+        sequence_index = load_sequence_index(root, sequence_model) if sequence_model is not None else None
+        indexes = {SEQUENCE_ALGORITHM: sequence_index} if sequence_index is not None else None
+        return cls(load_rule_sets(root, rule_files), cache, signature, indexes)
+
+    @property
+    def algorithms(self):
+        return list(self.indexes)
+
+    def name(self, algorithm):
+        """Name under which an algorithm was loaded ('fp_growth' -> 'FP-Growth')"""
+        name = self._names.get(algorithm_key(algorithm))
+        if name is None:
+            raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {self.algorithms}")
+        return name
+
+    def index(self, algorithm):
+        return self.indexes[self.name(algorithm)]
+
+    def _ranked(self, kind, algorithm, session):
+        """Full ranked predictions of a session ('pages' or 'frame'), from the cache when possible"""
+        name = self.name(algorithm)
+        index = self.indexes[name]
+        key = None
+        if self.cache is not None:
+            # Pages the model does not know do not change the predictions
+            key = (self._generation, kind, name, index.cache_key(session))
+            ranked = self.cache.get(key)
+            if ranked is not None:
+                return ranked
+        if kind == 'pages':
+            ranked = index.top_pages(session, None)
+        else:
+            ranked = index.predict(session, len(index.paths))
+        if key is not None:
+            self.cache.put(key, ranked)
+        return ranked
+
+    def predict(self, algorithm, session, top_n=20):
+        """Top pages for a session (list of paths) as dicts, best first"""
+        if self.cache is None:
+            return self.index(algorithm).top_pages(session, top_n)
+        return self._ranked('pages', algorithm, session)[:top_n]
+
+    def predict_frame(self, algorithm, session, top_n=20):
+        """Top pages for a session as the dashboard's prediction frame"""
+        if self.cache is None:
+            return self.index(algorithm).predict(session, top_n)
+        return self._ranked('frame', algorithm, session).head(top_n)
+
+    def predict_batch(self, algorithm, sessions, top_n=20):
+        """Top pages of every session, in order"""
+        return [self.predict(algorithm, session, top_n) for session in sessions]
@@ -0,0 +1,232 @@
+"""
+evaluate.py
+Hold-out evaluation of next-page prediction, quality against cost:
+- Splits the cleaned sessions by time: the first sessions of the file (they
+  are written as they end) are mined, the last --test-fraction are replayed
+- For every algorithm and min_support, mines the train split as pipeline.py
+  does and builds the rule index; 'sequential' builds the Markov model of
+  usedAlgorithme/sequences.py instead (contexts seen in at least min_support
+  of the train sessions)
+- Replays each test session prefix by prefix: after pages 1..i, is page i + 1
+  among the top k predictions? Pages already visited in the prefix are not
+  predicted by design, so revisits are not counted as queries
+- Each rule set is scored with several rankings (--rankings): the dashboard's
+  score (confidence x (1 + 0.1 x (lift - 1))), confidence and lift alone (the
+  Markov model has its own, 'backoff')
+- Reports hit@k, MRR (over the top max k), coverage (queries with at least
+  one prediction) and the latency percentiles of a prediction, plus the
+  mining time and rule count
+- Configurations run in parallel in a process pool; latencies measured with
+  several workers on a busy machine include the contention (--workers 1 for
+  clean numbers)
+
+Results are printed and appended to a CSV with the date and git commit.
+
+Usage (from the project root):
+    python -m prediction.evaluate --min-supports 0.02 0.01 0.005
+    python -m prediction.evaluate --algorithms ECLAT sequential --min-supports 0.01 0.001
+    python -m prediction.evaluate Data/extractedAndcleanedData/cleaned_data.csv --algorithms fp_growth ECLAT --test-fraction 0.1
+"""
+
+import argparse
+import csv
+import os
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+
+from cleanningData.transactions import Transactions
+from usedAlgorithme.benchmark import current_commit
+from usedAlgorithme.mining import CLEANED_DATA, DROPPED_PATHS, encode_sparse, load_transactions
+from usedAlgorithme.pipeline import ALGORITHMS, generate_rules, mine, select_paths
+from usedAlgorithme.sequences import build_model, ordered_sessions
+
+from .rule_index import RuleIndex, score_rules
+from .sequence_index import SequenceIndex
+
+
+RESULTS = 'Data/evaluation/results.csv'
+KS = [1, 3, 5, 10]
+SEQUENTIAL = 'sequential'
+MARKOV_ORDER = 3
+
+# Functions of (confidence, lift) the rules can be ranked by
+RANKINGS = {
+    'score': score_rules,
+    'confidence': lambda confidence, lift: confidence,
+    'lift': lambda confidence, lift: lift,
+}
+
+# Train matrix, ordered train sessions and test sessions of a process worker
+_train = None
+_sequences = None
+_test = None
+
+
+def split_sessions(transactions, test_fraction=0.2):
+    """(train, test) Transactions: the last test_fraction of the sessions are the test split"""
+    n_train = len(transactions) - int(round(len(transactions) * test_fraction))
+    offsets = np.asarray(transactions.offsets)
+    train = Transactions(offsets[:n_train + 1], transactions.items[:offsets[n_train]], transactions.paths)
+    test = Transactions(offsets[n_train:] - offsets[n_train], transactions.items[offsets[n_train]:], transactions.paths)
+    return train, test
+
+
+def sample_sessions(transactions, max_sessions=None, seed=0):
+    """Sessions (lists of paths, in visit order) of a Transactions, a random subset beyond max_sessions"""
+    rows = np.arange(len(transactions))
+    if max_sessions is not None and len(rows) > max_sessions:
+        rows = np.sort(np.random.default_rng(seed).choice(rows, max_sessions, replace=False))
+    paths = np.asarray(transactions.paths, dtype=object)
+    return [list(paths[transactions[i]]) for i in rows]
+
+
+def replay(index, sessions, ks=KS):
+    """
+    Prefix-by-prefix replay of sessions through a rule index.
+    Returns the metrics (hit@k, mrr, coverage, queries, latency percentiles in ms).
+    """
+    max_k = max(ks)
+    ranks, latencies = [], []
+    for session in sessions:
+        for i in range(1, len(session)):
+            target = session[i]
+            if target in session[:i]:
+                continue
+            started = time.perf_counter()
+            predictions = index.top_pages(session[:i], max_k)
+            latencies.append(time.perf_counter() - started)
+            pages = [p['page'] for p in predictions]
+            # 0: nothing predicted, -1: predicted but missed
+            ranks.append(pages.index(target) + 1 if target in pages else (-1 if pages else 0))
+
+    ranks = np.asarray(ranks, dtype=np.int64)
+    latencies = np.asarray(latencies) * 1000
+    n = max(len(ranks), 1)
+    metrics = {'queries': len(ranks)}
+    for k in ks:
+        metrics[f'hit@{k}'] = round(float(((ranks > 0) & (ranks <= k)).sum() / n), 4)
+    metrics['mrr'] = round(float(np.where(ranks > 0, 1.0 / np.maximum(ranks, 1), 0.0).sum() / n), 4)
+    metrics['coverage'] = round(float((ranks != 0).sum() / n), 4)
+    for q in (50, 90, 99):
+        metrics[f'latency_p{q}_ms'] = round(float(np.percentile(latencies, q)), 4) if len(latencies) else None
+    return metrics
+
+
+def evaluate_sequences(min_support, sequences, test_sessions, order=MARKOV_ORDER, ks=KS):
+    """Build the Markov model of the ordered train sessions and replay the test sessions"""
+    started = time.perf_counter()
+    min_count = max(int(np.ceil(min_support * len(sequences))), 1)
+    tables, counts, metadata = build_model(sequences, order, min_count)
+    index = SequenceIndex(tables, sequences.paths, counts, metadata)
+    row = {'algorithm': SEQUENTIAL, 'min_support': min_support, 'ranking': 'backoff',
+           'rules': len(index), 'mining_seconds': round(time.perf_counter() - started, 3)}
+    row.update(replay(index, test_sessions, ks))
+    return [row]
+
+
+def evaluate_config(algorithm, min_support, matrix, columns, test_sessions, min_confidence=0.5,
+                    rankings=('score',), ks=KS):
+    """Mine the train matrix with one configuration and replay the test sessions once per ranking"""
+    started = time.perf_counter()
+    matrix, kept = select_paths(matrix, columns, DROPPED_PATHS[algorithm])
+    frequent_itemsets = mine(algorithm, matrix, kept, min_support)
+    rules = generate_rules(frequent_itemsets, min_confidence)
+    mining_seconds = time.perf_counter() - started
+
+    results = []
+    for ranking in rankings:
+        index = RuleIndex(rules, score=RANKINGS[ranking])
+        row = {'algorithm': algorithm, 'min_support': min_support, 'ranking': ranking,
+               'rules': len(index), 'mining_seconds': round(mining_seconds, 3)}
+        row.update(replay(index, test_sessions, ks))
+        results.append(row)
+    return results
+
+
+def _init_worker(train, sequences, test):
+    global _train, _sequences, _test
+    _train, _sequences, _test = train, sequences, test
+
+
+def _evaluate_in_worker(args):
+    algorithm, min_support, options = args
+    if algorithm == SEQUENTIAL:
+        return evaluate_sequences(min_support, _sequences, _test, options.get('order', MARKOV_ORDER),
+                                  options.get('ks', KS))
+    options = {key: value for key, value in options.items() if key != 'order'}
+    matrix, columns = _train
+    return evaluate_config(algorithm, min_support, matrix, columns, _test, **options)
+
+
+def run_evaluation(filename=CLEANED_DATA, algorithms=ALGORITHMS, min_supports=(0.01,), test_fraction=0.2,
+                   max_sessions=5000, workers=None, seed=0, **options):
+    """
+    Split, then evaluate every (algorithm, min_support) in a process pool.
+    options go to evaluate_config (min_confidence, rankings, ks) and to
+    evaluate_sequences (order). Returns the result rows.
+    """
+    train, test = split_sessions(load_transactions(filename), test_fraction)
+    sequences = ordered_sessions(train) if SEQUENTIAL in algorithms else None
+    train = encode_sparse(train)
+    test = sample_sessions(test, max_sessions, seed)
+    configs = [(algorithm, min_support, options) for algorithm in algorithms for min_support in min_supports]
+
+    workers = min(workers or os.cpu_count() or 1, len(configs))
+    if workers <= 1:
+        _init_worker(train, sequences, test)
+        results = [_evaluate_in_worker(config) for config in configs]
+    else:
+        with Pool(workers, initializer=_init_worker, initargs=(train, sequences, test)) as pool:
+            results = pool.map(_evaluate_in_worker, configs, chunksize=1)
+    return [row for rows in results for row in rows]
+
+
+def append_results(rows, output=RESULTS):
+    """Append result rows (with the date and commit) to the results CSV"""
+    if not rows:
+        return
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    run_at, commit = datetime.now().isoformat(timespec='seconds'), current_commit()
+    rows = [{'run_at': run_at, 'commit': commit, **row} for row in rows]
+    new_file = not os.path.exists(output)
+    with open(output, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hold-out evaluation of next-page prediction for every rule set.")
+    parser.add_argument('input', nargs='?', default=CLEANED_DATA, help="Cleaned sessions file, in time order")
+    parser.add_argument('--algorithms', nargs='+', default=ALGORITHMS, choices=ALGORITHMS + [SEQUENTIAL])
+    parser.add_argument('--min-supports', nargs='+', type=float, default=[0.01])
+    parser.add_argument('--min-confidence', type=float, default=0.5)
+    parser.add_argument('--rankings', nargs='+', default=list(RANKINGS), choices=list(RANKINGS))
+    parser.add_argument('--ks', nargs='+', type=int, default=KS, help="Cutoffs of hit@k")
+    parser.add_argument('--order', type=int, default=MARKOV_ORDER, help="Longest context of the sequential model")
+    parser.add_argument('--test-fraction', type=float, default=0.2, help="Last sessions held out")
+    parser.add_argument('--max-sessions', type=int, default=5000, help="Test sessions replayed (random sample)")
+    parser.add_argument('--workers', type=int, default=None, help="Processes (default: one per CPU)")
+    parser.add_argument('--output', default=RESULTS, help="Results CSV (appended)")
+    args = parser.parse_args()
+
+    rows = run_evaluation(args.input, args.algorithms, args.min_supports, args.test_fraction, args.max_sessions,
+                          args.workers, min_confidence=args.min_confidence, rankings=args.rankings,
+                          ks=sorted(args.ks), order=args.order)
+    for row in rows:
+        hits = ' '.join(f"hit@{k} {row[f'hit@{k}']:.3f}" for k in sorted(args.ks))
+        print(f"{row['algorithm']:10} {row['min_support']:<7} {row['ranking']:10} {row['rules']:>6} rules  "
+              f"{hits}  mrr {row['mrr']:.3f}  coverage {row['coverage']:.3f}  "
+              f"p50 {row['latency_p50_ms']} ms  p99 {row['latency_p99_ms']} ms  ({row['queries']} queries)")
+    append_results(rows, args.output)
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
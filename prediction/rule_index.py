@@ -0,0 +1,287 @@
+"""
+rule_index.py
+Inverted index over association rules for next-page prediction:
+- Maps every antecedent page to the rules it appears in
+- Finds the rules whose antecedents are covered by a session by counting hits
+- Keeps the best scoring rule per predicted page in one vectorized pass
+- Scores many sessions at once as sparse matrix products (top_pages_matrix)
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+PREDICTION_COLUMNS = ['Predicted Page', 'Confidence', 'Lift', 'Support', 'Score', 'Based On']
+
+
+def score_rules(confidence, lift):
+    """
+    Score used to rank predictions: prefers higher confidence and
+    slightly rewards lift.
+    """
+    return confidence * (1 + (lift - 1) * 0.1)
+
+
+def _gather(ptr, values, rows):
+    """
+    Concatenate the CSR slices values[ptr[r]:ptr[r + 1]] for every r in rows.
+    Returns the gathered values and, for each one, the row it came from.
+    """
+    starts = ptr[rows]
+    lengths = ptr[rows + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return values[:0], rows[:0]
+    ends = np.cumsum(lengths)
+    offsets = np.arange(total) - np.repeat(ends - lengths, lengths)
+    return values[np.repeat(starts, lengths) + offsets], np.repeat(rows, lengths)
+
+
+def _contains(sorted_ids, values):
+    """Whether each value is in sorted_ids (faster than np.isin for small arrays)"""
+    if len(sorted_ids) == 0:
+        return np.zeros(len(values), dtype=bool)
+    i = np.searchsorted(sorted_ids, values)
+    i[i == len(sorted_ids)] = 0
+    return sorted_ids[i] == values
+
+
+class RuleIndex:
+    """
+    Prebuilt lookup structure for one rule set.
+    Rules are stored as CSR arrays of page ids so a prediction only touches
+    the rules that share at least one page with the session.
+    """
+
+    def __init__(self, rules_df, score=score_rules):
+        """score: function of (confidence, lift) arrays ranking the rules"""
+        self.paths = []
+        self._path_ids = {}
+
+        ant_ptr, ant_items = [0], []
+        cons_ptr, cons_items = [0], []
+        rule_rows = []
+        based_on = []
+
+        if rules_df is not None and len(rules_df) > 0 and \
+                'antecedents' in rules_df.columns and 'consequents' in rules_df.columns:
+            for row, (antecedents, consequents) in enumerate(zip(rules_df['antecedents'], rules_df['consequents'])):
+                # skip malformed rows
+                if not isinstance(antecedents, (set, frozenset)) or not antecedents:
+                    continue
+                if not isinstance(consequents, (set, frozenset)) or not consequents:
+                    continue
+
+                ant_items.extend(self._path_id(page) for page in antecedents)
+                ant_ptr.append(len(ant_items))
+                cons_items.extend(self._path_id(page) for page in consequents)
+                cons_ptr.append(len(cons_items))
+                rule_rows.append(row)
+                based_on.append(', '.join(sorted(antecedents)))
+
+        # Row of each rule in the rules frame
+        self.rows = rule_rows = np.asarray(rule_rows, dtype=np.int64)
+        self._ant_ptr = np.asarray(ant_ptr, dtype=np.int64)
+        self._ant_len = np.diff(self._ant_ptr)
+        self._cons_ptr = np.asarray(cons_ptr, dtype=np.int64)
+        self._cons_items = np.asarray(cons_items, dtype=np.int64)
+        self._based_on = np.asarray(based_on, dtype=object)
+
+        self.confidence = self._metric(rules_df, 'confidence', 0.0, rule_rows)
+        self.lift = self._metric(rules_df, 'lift', 1.0, rule_rows)
+        self.support = self._metric(rules_df, 'support', 0.0, rule_rows)
+        self.score = np.asarray(score(self.confidence, self.lift), dtype=np.float64)
+        # Rank of every rule by decreasing score, ties going to the earliest rule
+        self._rule_rank = np.empty(len(rule_rows), dtype=np.int64)
+        self._rule_rank[np.lexsort((np.arange(len(rule_rows)), -self.score))] = np.arange(len(rule_rows))
+
+        # Inverted index: page id -> ids of the rules having it in their antecedents
+        ant_items = np.asarray(ant_items, dtype=np.int64)
+        ant_rules = np.repeat(np.arange(len(rule_rows)), self._ant_len)
+        order = np.argsort(ant_items, kind='stable')
+        self._postings = ant_rules[order]
+        self._post_ptr = np.zeros(len(self.paths) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(ant_items, minlength=len(self.paths)), out=self._post_ptr[1:])
+
+    def __len__(self):
+        return len(self._ant_len)
+
+    def _path_id(self, page):
+        path_id = self._path_ids.get(page)
+        if path_id is None:
+            path_id = len(self.paths)
+            self._path_ids[page] = path_id
+            self.paths.append(page)
+        return path_id
+
+    @staticmethod
+    def _metric(rules_df, column, default, rule_rows):
+        if rules_df is None or column not in rules_df.columns:
+            return np.full(len(rule_rows), default, dtype=np.float64)
+        return rules_df[column].to_numpy(dtype=np.float64)[rule_rows]
+
+    def path_ids(self, paths):
+        """Index id of every path, -1 for the paths no rule mentions"""
+        return np.asarray([self._path_ids.get(p, -1) for p in paths], dtype=np.int64)
+
+    def session_ids(self, user_paths):
+        """Ids of the session pages known to the index"""
+        return np.asarray(sorted({self._path_ids[p] for p in user_paths if p in self._path_ids}), dtype=np.int64)
+
+    def cache_key(self, user_paths):
+        """What the predictions depend on: the set of known session pages"""
+        return tuple(self.session_ids(user_paths).tolist())
+
+    def matching_rules(self, session_ids):
+        """
+        Ids (in rule order) of the rules whose antecedents are all in the session.
+        """
+        hits, _ = _gather(self._post_ptr, self._postings, session_ids)
+        if len(hits) == 0:
+            return hits
+        if len(self) <= 64 * len(hits):
+            # Counting over every rule is cheaper than sorting the hits
+            counts = np.bincount(hits, minlength=len(self))
+            return np.flatnonzero(counts == self._ant_len)
+        rules, counts = np.unique(hits, return_counts=True)
+        return rules[counts == self._ant_len[rules]]
+
+    def best_rules(self, user_paths):
+        """
+        For each page predicted for a session (not already visited), the first
+        best-scoring rule that predicts it: (page ids, rule ids), in the order
+        pages are first predicted, as the rule scan produced them.
+        """
+        session_ids = self.session_ids(user_paths)
+        rules = self.matching_rules(session_ids)
+        pages, page_rules = _gather(self._cons_ptr, self._cons_items, rules)
+        keep = ~_contains(session_ids, pages)
+        pages, page_rules = pages[keep], page_rules[keep]
+        if len(pages) == 0:
+            return pages, page_rules
+
+        # Best score per page, ties going to the earliest rule
+        position = np.arange(len(pages))
+        order = np.lexsort((position, -self.score[page_rules], pages))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = pages[order][1:] != pages[order][:-1]
+        best = order[first]
+
+        _, first_seen = np.unique(pages, return_index=True)
+        best = best[np.argsort(first_seen, kind='stable')]
+        return pages[best], page_rules[best]
+
+    def top_pages(self, user_paths, top_n=20):
+        """
+        Best predictions for a session as a list of dicts (page, confidence,
+        lift, support, score, based_on), by decreasing score, ties in the order
+        pages are first predicted (all of them with top_n None). The predictions of predict() without
+        building a frame, for low-latency callers.
+        """
+        if not user_paths or len(self) == 0:
+            return []
+        pages, rules = self.best_rules(user_paths)
+        order = np.argsort(-self.score[rules], kind='stable')[:top_n]
+        pages, rules = pages[order].tolist(), rules[order]
+        return [
+            {'page': self.paths[page], 'confidence': confidence, 'lift': lift, 'support': support,
+             'score': score, 'based_on': based_on}
+            for page, confidence, lift, support, score, based_on in zip(
+                pages, self.confidence[rules].tolist(), self.lift[rules].tolist(),
+                self.support[rules].tolist(), self.score[rules].tolist(), self._based_on[rules].tolist())
+        ]
+
+    def predict(self, user_paths, top_n=20):
+        """
+        Get page predictions based on a browsing session.
+        Same output as scanning every rule: for each page not already visited,
+        the first best-scoring rule that predicts it.
+        """
+        if not user_paths or len(self) == 0:
+            return pd.DataFrame()
+
+        pages, best_rules = self.best_rules(user_paths)
+        if len(pages) == 0:
+            return pd.DataFrame()
+
+        results = pd.DataFrame({
+            'Predicted Page': [self.paths[p] for p in pages],
+            'Confidence': self.confidence[best_rules],
+            'Lift': self.lift[best_rules],
+            'Support': self.support[best_rules],
+            'Score': self.score[best_rules],
+            'Based On': self._based_on[best_rules],
+        }, columns=PREDICTION_COLUMNS)
+
+        return results.sort_values('Score', ascending=False, kind='stable').head(top_n)
+
+    def session_matrix(self, offsets, items):
+        """
+        Boolean CSR matrix (sessions x index paths) of sessions given as CSR
+        arrays of index path ids (unknown pages left out beforehand).
+        """
+        rows = np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+        matrix = sparse.csr_matrix((np.ones(len(items), dtype=np.int32), (rows, items)),
+                                   shape=(len(offsets) - 1, len(self.paths)))
+        # Repeated pages were summed
+        matrix.data[:] = 1
+        return matrix
+
+    def top_pages_matrix(self, sessions, top_n=20):
+        """
+        top_pages() of every row of a session matrix (see session_matrix), at once:
+        - (sessions x paths) @ (paths x rules) counts the antecedent pages each
+          session has; a rule matches where that is its antecedent length
+        - every matching rule proposes its consequents, visited pages excluded,
+          and each (session, page) keeps its first best-scoring rule
+        Returns (sessions, pages, rules) arrays, sorted by session then rank.
+        """
+        sessions = sparse.csr_matrix(sessions)
+        sessions.sort_indices()
+        antecedents = sparse.csr_matrix(
+            (np.ones(len(self._postings), dtype=np.int32), self._postings, self._post_ptr),
+            shape=(len(self.paths), len(self)))
+        hits = (sessions @ antecedents).tocsr()
+        matched = np.flatnonzero(hits.data == self._ant_len.astype(np.int32)[hits.indices])
+        match_sessions = np.searchsorted(hits.indptr, matched, side='right') - 1
+        match_rules = hits.indices[matched].astype(np.int64)
+
+        # Consequents of every match; their position in _cons_items is the rule scan order
+        starts = self._cons_ptr[match_rules]
+        lengths = self._cons_ptr[match_rules + 1] - starts
+        total = int(lengths.sum())
+        position = np.repeat(starts, lengths) + (np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+        session_of = np.repeat(match_sessions, lengths)
+        pages = self._cons_items[position]
+        rules = np.repeat(match_rules, lengths)
+
+        # Visited pages: (session, page) keys of the sorted session matrix
+        n_paths = max(len(self.paths), 1)
+        visited = np.repeat(np.arange(sessions.shape[0]), np.diff(sessions.indptr)) * n_paths + sessions.indices
+        keep = ~_contains(visited, session_of * n_paths + pages)
+        session_of, pages, rules, position = session_of[keep], pages[keep], rules[keep], position[keep]
+        if len(pages) == 0:
+            return session_of, pages, rules
+
+        # Best rule per (session, page), ties going to the earliest rule: one
+        # integer sort key instead of a lexsort on four arrays
+        pair = session_of * n_paths + pages
+        order = np.argsort(pair * max(len(self), 1) + self._rule_rank[rules])
+        pair, session_of, pages, rules, position = pair[order], session_of[order], pages[order], rules[order], position[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = pair[1:] != pair[:-1]
+        group_starts = np.flatnonzero(first)
+        first_seen = np.minimum.reduceat(position, group_starts)
+        session_of, pages, rules = session_of[first], pages[first], rules[first]
+
+        # Rank within each session: decreasing score, ties in the order pages are first predicted
+        order = np.lexsort((first_seen, -self.score[rules], session_of))
+        session_of, pages, rules = session_of[order], pages[order], rules[order]
+        session_starts = np.zeros(len(order), dtype=np.int64)
+        new_session = np.ones(len(order), dtype=bool)
+        new_session[1:] = session_of[1:] != session_of[:-1]
+        session_starts[new_session] = np.flatnonzero(new_session)
+        rank = np.arange(len(order)) - np.maximum.accumulate(session_starts)
+        top = rank < top_n
+        return session_of[top], pages[top], rules[top]
@@ -0,0 +1,144 @@
+"""
+sequence_index.py
+Next-page prediction from the k-th order Markov model of usedAlgorithme/sequences.py:
+- Uses the order of the session: the context is its last 1..k pages
+- Each context length is a sorted array of context codes, so a lookup is one
+  binary search per length, O(k log contexts), whatever the number of rules
+- Back-off (stupid back-off, Brants et al.): a page seen after the longest
+  context gets its transition probability, one only seen after shorter
+  contexts gets it times BACKOFF per page dropped from the context
+- Same outputs as RuleIndex (top_pages dicts, predict frame), so it plugs
+  into PredictionEngine as one more algorithm; Confidence is the transition
+  probability and Based On the context
+- The paths left out of the training sessions (metadata 'dropped', the noise
+  paths) are left out of the query sessions too, before repeats are collapsed
+"""
+
+import numpy as np
+import pandas as pd
+
+from usedAlgorithme.mining import NOISE
+from usedAlgorithme.sequences import encode_context, load_tables
+
+from .rule_index import PREDICTION_COLUMNS
+
+
+BACKOFF = 0.4
+
+
+class SequenceIndex:
+    """Transition tables of one Markov model, in memory or memory-mapped."""
+
+    def __init__(self, tables, paths, page_counts, metadata=None):
+        # Plain arrays (views of the memory maps): cheaper to index
+        self.tables = {length: tuple(np.asarray(array) for array in table) for length, table in tables.items()}
+        self.paths = list(paths)
+        self.order = max(tables, default=0)
+        self.metadata = metadata or {}
+        # Models saved before 'dropped' was recorded were trained without NOISE
+        self.dropped = set(self.metadata.get('dropped', NOISE))
+        self._path_ids = {path: i for i, path in enumerate(self.paths) if path not in self.dropped}
+        self._n_paths = max(len(self.paths), 1)
+        page_counts = np.asarray(page_counts, dtype=np.float64)
+        self._page_share = (page_counts / max(page_counts.sum(), 1)).tolist()
+        self._transitions = {length: max(int(np.asarray(counts).sum()), 1)
+                             for length, (_, _, _, counts) in tables.items()}
+
+    @classmethod
+    def load(cls, directory):
+        tables, paths, page_counts, metadata = load_tables(directory)
+        return cls(tables, paths, page_counts, metadata)
+
+    def __len__(self):
+        """Contexts of every length"""
+        return sum(len(keys) for keys, _, _, _ in self.tables.values())
+
+    @property
+    def pages(self):
+        """Paths a session can be made of (the dropped ones left out)"""
+        return [path for path in self.paths if path not in self.dropped]
+
+    def session_ids(self, user_paths):
+        """Ids of the known session pages in visit order, dropped paths left out, then repeats collapsed"""
+        ids = []
+        for page in user_paths:
+            path_id = self._path_ids.get(page)
+            if path_id is not None and (not ids or ids[-1] != path_id):
+                ids.append(path_id)
+        return ids
+
+    def cache_key(self, user_paths):
+        """What the predictions depend on: the last order pages, in order, and the visited pages"""
+        ids = self.session_ids(user_paths)
+        return tuple(ids[-self.order:]) if self.order else (), tuple(sorted(set(ids)))
+
+    def ranked(self, user_paths):
+        """
+        (page ids, scores, probabilities, counts, context lengths) arrays,
+        best first, of the pages not visited yet, plus the session ids; ties
+        go to the longer context, then to the more frequent transition.
+        """
+        ids = self.session_ids(user_paths)
+        pages, scores, probabilities, counts, lengths = [], [], [], [], []
+        # Visited pages, then the pages already proposed by a longer context
+        seen = np.zeros(self._n_paths, dtype=bool)
+        seen[ids] = True
+        longest = min(self.order, len(ids))
+        for length in range(longest, 0, -1):
+            keys, ptr, following, transitions = self.tables[length]
+            key = encode_context(ids[-length:], self._n_paths)
+            row = int(np.searchsorted(keys, key))
+            if row == len(keys) or keys[row] != key:
+                continue
+            start, end = ptr[row], ptr[row + 1]
+            next_pages, next_counts = following[start:end], transitions[start:end]
+            probability = next_counts / next_counts.sum()
+            new = ~seen[next_pages]
+            seen[next_pages] = True
+            pages.append(next_pages[new])
+            probabilities.append(probability[new])
+            scores.append(probability[new] * BACKOFF ** (longest - length))
+            counts.append(next_counts[new])
+            lengths.append(np.full(int(new.sum()), length))
+        if not pages:
+            return [np.empty(0)] * 5 + [ids]
+
+        pages, scores, probabilities, counts, lengths = (
+            np.concatenate(column) for column in (pages, scores, probabilities, counts, lengths))
+        order = np.argsort(-scores, kind='stable')
+        return pages[order], scores[order], probabilities[order], counts[order], lengths[order], ids
+
+    def top_pages(self, user_paths, top_n=20):
+        """Best predictions as a list of dicts (page, confidence, lift, support, score, based_on)"""
+        if not user_paths or self.order == 0:
+            return []
+        pages, scores, probabilities, counts, lengths, ids = self.ranked(user_paths)
+        pages, scores, probabilities, counts, lengths = (
+            column[:top_n].tolist() for column in (pages, scores, probabilities, counts, lengths))
+        contexts = {length: ' → '.join(self.paths[i] for i in ids[-length:]) for length in set(lengths)}
+        predictions = []
+        for page, score, probability, count, length in zip(pages, scores, probabilities, counts, lengths):
+            share = self._page_share[page]
+            predictions.append({
+                'page': self.paths[page],
+                'confidence': probability,
+                'lift': probability / share if share > 0 else 1.0,
+                'support': count / self._transitions[length],
+                'score': score,
+                'based_on': contexts[length],
+            })
+        return predictions
+
+    def predict(self, user_paths, top_n=20):
+        """Predictions as the dashboard's frame (PREDICTION_COLUMNS)"""
+        predictions = self.top_pages(user_paths, top_n)
+        if not predictions:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            'Predicted Page': [p['page'] for p in predictions],
+            'Confidence': [p['confidence'] for p in predictions],
+            'Lift': [p['lift'] for p in predictions],
+            'Support': [p['support'] for p in predictions],
+            'Score': [p['score'] for p in predictions],
+            'Based On': [p['based_on'] for p in predictions],
+        }, columns=PREDICTION_COLUMNS)
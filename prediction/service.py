@@ -0,0 +1,191 @@
+"""
+service.py
+HTTP prediction service (Starlette on uvicorn), to prefetch pages at request time:
+- The three rule sets (and the sequence model, when built) are loaded once,
+  at startup (see engine.py)
+- POST /predict       {"algorithm": "ECLAT", "session": ["/a", "/b"], "top_n": 10}
+                      -> {"algorithm": ..., "predictions": [{"page": ..., "confidence": ..., ...}]}
+- POST /predict/batch {"algorithm": "ECLAT", "sessions": [["/a"], ["/b", "/c"]], "top_n": 10}
+                      -> {"algorithm": ..., "predictions": [[...], [...]]}
+- GET /predict?algorithm=ECLAT&page=/a&page=/b&top_n=10, for plain prefetch links
+- GET /health         -> rules loaded per algorithm and prediction cache counters
+
+Full ranked predictions are cached per algorithm and session page set (see
+cache.py), so popular entry pages are answered without touching the rules.
+The rule files are checked every --reload-interval seconds; when a mining
+job rewrote them, the engine is rebuilt and the cache cleared.
+
+A single prediction takes a fraction of a millisecond (about 0.1 ms, 0.25 ms
+at p99), so it is answered on the event loop directly; batches run in the
+thread pool so that they do not hold up single requests. Most of a request is
+the HTTP stack: with httptools a local round trip is about 0.7 ms at p50 and
+1 ms at p99 on a CPU shared with the client. Bad requests get a 400 with
+{"error": ...}.
+
+Usage (from the project root):
+    python -m prediction.service --port 8000
+"""
+
+import argparse
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from .cache import DEFAULT_MAX_ENTRIES, DEFAULT_TTL, PredictionCache
+from .engine import PredictionEngine, rules_signature
+
+
+DEFAULT_TOP_N = 10
+MAX_TOP_N = 100
+MAX_BATCH = 10_000
+RELOAD_INTERVAL = 30
+
+
+class BadRequest(Exception):
+    """Malformed prediction request"""
+
+
+def _top_n(value):
+    try:
+        top_n = int(value)
+    except (TypeError, ValueError):
+        raise BadRequest("top_n must be an integer")
+    if not 1 <= top_n <= MAX_TOP_N:
+        raise BadRequest(f"top_n must be between 1 and {MAX_TOP_N}")
+    return top_n
+
+
+def _session(value):
+    if not isinstance(value, list) or not all(isinstance(page, str) for page in value):
+        raise BadRequest("a session must be a list of paths")
+    return value
+
+
+async def _body(request):
+    try:
+        body = await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise BadRequest("the body must be JSON")
+    if not isinstance(body, dict):
+        raise BadRequest("the body must be a JSON object")
+    return body
+
+
+def _error(message, status_code=400):
+    return JSONResponse({'error': message}, status_code=status_code)
+
+
+async def predict(request):
+    engine = request.app.state.engine
+    try:
+        if request.method == 'GET':
+            params = request.query_params
+            algorithm = params.get('algorithm', '')
+            session = params.getlist('page')
+            top_n = _top_n(params.get('top_n', DEFAULT_TOP_N))
+        else:
+            body = await _body(request)
+            algorithm = body.get('algorithm', '')
+            session = _session(body.get('session'))
+            top_n = _top_n(body.get('top_n', DEFAULT_TOP_N))
+        predictions = engine.predict(algorithm, session, top_n)
+    except (BadRequest, ValueError) as e:
+        return _error(str(e))
+    return JSONResponse({'algorithm': algorithm, 'predictions': predictions})
+
+
+async def predict_batch(request):
+    engine = request.app.state.engine
+    try:
+        body = await _body(request)
+        algorithm = body.get('algorithm', '')
+        sessions = body.get('sessions')
+        if not isinstance(sessions, list):
+            raise BadRequest("sessions must be a list of sessions")
+        if len(sessions) > MAX_BATCH:
+            raise BadRequest(f"at most {MAX_BATCH} sessions per batch")
+        sessions = [_session(session) for session in sessions]
+        top_n = _top_n(body.get('top_n', DEFAULT_TOP_N))
+        engine.index(algorithm)
+    except (BadRequest, ValueError) as e:
+        return _error(str(e))
+    predictions = await run_in_threadpool(engine.predict_batch, algorithm, sessions, top_n)
+    return JSONResponse({'algorithm': algorithm, 'predictions': predictions})
+
+
+async def health(request):
+    engine = request.app.state.engine
+    return JSONResponse({
+        'algorithms': {name: len(index) for name, index in engine.indexes.items()},
+        'cache': engine.cache.stats() if engine.cache is not None else None,
+    })
+
+
+async def _reload_rules(app, root, cache, interval):
+    """Rebuild the engine whenever the rule files under root change"""
+    while True:
+        await asyncio.sleep(interval)
+        if rules_signature(root) == app.state.engine.signature:
+            continue
+        try:
+            app.state.engine = await run_in_threadpool(PredictionEngine.from_files, root, cache=cache)
+        except (OSError, ValueError) as e:
+            # A job may still be writing them: keep the current rules, retry next time
+            print(f"Could not reload the rules: {e}")
+
+
+def create_app(engine=None, root='.', cache=None, reload_interval=RELOAD_INTERVAL):
+    """
+    The service application. Without an engine, the rule sets found under
+    root are loaded when the server starts (in front of cache, if any) and
+    reloaded when they change (reload_interval seconds, None: never).
+    """
+    @asynccontextmanager
+    async def lifespan(app):
+        if engine is not None:
+            app.state.engine = engine
+            yield
+            return
+        app.state.engine = PredictionEngine.from_files(root, cache=cache)
+        watcher = asyncio.create_task(_reload_rules(app, root, cache, reload_interval)) if reload_interval else None
+        yield
+        if watcher is not None:
+            watcher.cancel()
+
+    return Starlette(routes=[
+        Route('/predict', predict, methods=['GET', 'POST']),
+        Route('/predict/batch', predict_batch, methods=['POST']),
+        Route('/health', health, methods=['GET']),
+    ], lifespan=lifespan)
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve next-page predictions over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--root', default='.', help="Project root holding the Data/ rule exports")
+    parser.add_argument('--access-log', action='store_true', help="Log every request (adds latency)")
+    parser.add_argument('--cache-entries', type=int, default=DEFAULT_MAX_ENTRIES, help="Cached sessions (0: no cache)")
+    parser.add_argument('--cache-ttl', type=float, default=DEFAULT_TTL, help="Seconds a cached prediction is kept")
+    parser.add_argument('--cache-mb', type=float, default=64, help="Memory cap of the cache")
+    parser.add_argument('--reload-interval', type=float, default=RELOAD_INTERVAL,
+                        help="Seconds between checks of the rule files (0: never)")
+    args = parser.parse_args()
+
+    cache = None
+    if args.cache_entries > 0:
+        cache = PredictionCache(args.cache_entries, args.cache_ttl, int(args.cache_mb * (1 << 20)))
+    uvicorn.run(create_app(root=args.root, cache=cache, reload_interval=args.reload_interval),
+                host=args.host, port=args.port,
+                access_log=args.access_log, log_level='info')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+from usedAlgorithme.pipeline import main
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+benchmark.py
+Cost of Apriori, FP-Growth and ECLAT across supports and dataset sizes:
+- Datasets: synthetic sessions from an IBM Quest-style generator (transactions
+  built from a pool of correlated, randomly corrupted patterns) and prefixes
+  of cleaned_data.csv (the first n sessions)
+- Every (dataset, size, algorithm, min_support) of the grid runs in a fresh
+  process, so its peak RSS is its own; runs over --timeout are stopped
+- Only the sessions of the run are loaded and encoded (the first n of
+  cleaned_data.csv, not the whole file)
+- Records the mining wall time, the peak RSS while mining (counted from the
+  start of mine() on Linux, so loading does not show; the process peak
+  elsewhere) and the number (and largest size) of frequent itemsets
+- Results are appended to a CSV with the date and git commit, one row per
+  run, for regression tracking
+
+Algorithms are called the way pipeline.py calls them (mlxtend apriori on the
+sparse frame, fpgrowth on the CSR arrays, eclat on the sparse frame).
+
+Usage (from the project root):
+    python -m usedAlgorithme.benchmark --datasets quest --sizes 10000 100000 --min-supports 0.02 0.01
+    python -m usedAlgorithme.benchmark --datasets cleaned --sizes 50000 200000 --algorithms fp_growth ECLAT
+"""
+
+import argparse
+import csv
+import multiprocessing
+import os
+import subprocess
+import time
+from datetime import datetime
+
+import numpy as np
+
+from usedAlgorithme.mining import CLEANED_DATA, encode_sparse, load_transactions
+from usedAlgorithme.pipeline import ALGORITHMS, mine, peak_rss_mb, reset_peak_rss
+
+
+RESULTS = 'Data/benchmark/results.csv'
+DATASETS = ['quest', 'cleaned']
+
+FIELDS = ['run_at', 'commit', 'dataset', 'transactions', 'items', 'avg_length', 'algorithm',
+          'min_support', 'status', 'seconds', 'peak_rss_mb', 'itemsets', 'max_itemset_length']
+
+
+def quest_transactions(n_transactions, n_items=1000, avg_length=10, n_patterns=2000,
+                       avg_pattern_length=4, correlation=0.5, corruption=0.5, seed=0):
+    """
+    Synthetic sessions in the style of the IBM Quest generator (T10I4 by default):
+    - n_patterns potential itemsets of Poisson(avg_pattern_length) paths, each
+      taking an exponentially distributed fraction (mean correlation) of its
+      paths from the previous one, picked with exponential weights
+    - each transaction has Poisson(avg_length) paths, filled with picked
+      patterns from which a geometric number of paths is dropped (mean
+      corruption level per pattern around corruption)
+    Paths are named /q<item>.
+    """
+    rng = np.random.default_rng(seed)
+    patterns = []
+    previous = np.empty(0, dtype=np.int64)
+    for _ in range(n_patterns):
+        size = max(int(rng.poisson(avg_pattern_length)), 1)
+        n_shared = min(int(rng.exponential(correlation) * size), size, len(previous))
+        shared = rng.choice(previous, n_shared, replace=False)
+        fresh = rng.choice(n_items, size - n_shared, replace=False)
+        previous = np.union1d(shared, fresh)
+        patterns.append(previous)
+    weights = rng.exponential(1.0, n_patterns)
+    weights /= weights.sum()
+    levels = np.clip(rng.normal(corruption, 0.1, n_patterns), 0.0, 0.9)
+
+    lengths = np.maximum(rng.poisson(avg_length, n_transactions), 1)
+    picks = rng.choice(n_patterns, size=int(lengths.sum()) + 1, p=weights)
+    drops = rng.geometric(1 - levels[picks]) - 1
+    names = [f'/q{i}' for i in range(n_items)]
+
+    transactions = []
+    k = 0
+    for length in lengths:
+        items = set()
+        while len(items) < length:
+            if k == len(picks):
+                picks = rng.choice(n_patterns, size=len(picks), p=weights)
+                drops = rng.geometric(1 - levels[picks]) - 1
+                k = 0
+            pattern, drop = patterns[picks[k]], drops[k]
+            k += 1
+            if drop:
+                pattern = rng.permutation(pattern)[drop:]
+            # A pattern that does not fit is kept half of the time, as in Quest
+            if items and len(items) + len(pattern) > length and rng.random() < 0.5:
+                break
+            items.update(pattern.tolist())
+        transactions.append([names[i] for i in sorted(items)])
+    return transactions
+
+
+def load_dataset(dataset, n_transactions, filename=CLEANED_DATA, seed=0):
+    """Encoded (CSR matrix, columns) of n_transactions sessions of a dataset"""
+    if dataset == 'quest':
+        return encode_sparse(quest_transactions(n_transactions, seed=seed))
+    if dataset == 'cleaned':
+        return encode_sparse(load_transactions(filename, n_transactions))
+    raise ValueError(f"Unknown dataset '{dataset}', expected one of {DATASETS}")
+
+
+def _run_case(case, connection):
+    """Body of one benchmark process: load the data, mine, send the measures back."""
+    try:
+        matrix, columns = load_dataset(case['dataset'], case['size'], case['filename'])
+        result = {
+            'transactions': matrix.shape[0],
+            'items': int((matrix.getnnz(axis=0) > 0).sum()),
+            'avg_length': round(matrix.nnz / max(matrix.shape[0], 1), 2),
+        }
+        reset_peak_rss()
+        started = time.perf_counter()
+        frequent_itemsets = mine(case['algorithm'], matrix, columns, case['min_support'])
+        result['seconds'] = round(time.perf_counter() - started, 3)
+        result['itemsets'] = len(frequent_itemsets)
+        result['max_itemset_length'] = int(frequent_itemsets['itemsets'].map(len).max()) if len(frequent_itemsets) else 0
+        result['peak_rss_mb'] = peak_rss_mb()
+        result['status'] = 'ok'
+    except MemoryError:
+        result = {'status': 'out of memory'}
+    connection.send(result)
+    connection.close()
+
+
+def run_case(case, timeout=None):
+    """Run one benchmark case in a new process. Returns its measures."""
+    context = multiprocessing.get_context('spawn')
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_run_case, args=(case, sender))
+    process.start()
+    sender.close()
+    if receiver.poll(timeout):
+        try:
+            result = receiver.recv()
+        except EOFError:
+            result = {'status': 'failed'}
+    else:
+        process.terminate()
+        result = {'status': 'timeout', 'seconds': timeout}
+    process.join()
+    return result
+
+
+def current_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def append_results(rows, output=RESULTS):
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    new_file = not os.path.exists(output)
+    with open(output, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+
+def run_benchmark(datasets, sizes, min_supports, algorithms=ALGORITHMS, filename=CLEANED_DATA,
+                  timeout=None, output=RESULTS):
+    """Run the whole grid, print and append every result. Returns the rows."""
+    run_at = datetime.now().isoformat(timespec='seconds')
+    commit = current_commit()
+    rows = []
+    for dataset in datasets:
+        for size in sizes:
+            for min_support in min_supports:
+                for algorithm in algorithms:
+                    case = {'dataset': dataset, 'size': size, 'algorithm': algorithm,
+                            'min_support': min_support, 'filename': filename}
+                    result = run_case(case, timeout)
+                    row = {field: '' for field in FIELDS}
+                    row.update({'run_at': run_at, 'commit': commit, 'dataset': dataset, 'transactions': size,
+                                'algorithm': algorithm, 'min_support': min_support})
+                    row.update({key: value for key, value in result.items() if value is not None})
+                    rows.append(row)
+                    print(f"{dataset:8} {row['transactions']:>8} {algorithm:10} {min_support:<7} "
+                          f"{row['status']:8} {row['seconds']:>9}s {row['peak_rss_mb']!s:>9} MB "
+                          f"{row['itemsets']!s:>8} itemsets", flush=True)
+                    # Results are kept even if a later case is interrupted
+                    append_results([row], output)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the mining algorithms over supports and dataset sizes.")
+    parser.add_argument('--datasets', nargs='+', default=['quest'], choices=DATASETS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 50_000, 100_000],
+                        help="Transaction counts")
+    parser.add_argument('--min-supports', nargs='+', type=float, default=[0.05, 0.02, 0.01])
+    parser.add_argument('--algorithms', nargs='+', default=ALGORITHMS, choices=ALGORITHMS)
+    parser.add_argument('--input', default=CLEANED_DATA, help="Cleaned transactions file (cleaned dataset)")
+    parser.add_argument('--timeout', type=float, default=600, help="Seconds allowed per run")
+    parser.add_argument('--output', default=RESULTS, help="Results CSV (appended)")
+    args = parser.parse_args()
+
+    run_benchmark(args.datasets, args.sizes, args.min_supports, args.algorithms, args.input,
+                  args.timeout, args.output)
+    print(f"Results appended to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
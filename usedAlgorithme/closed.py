@@ -0,0 +1,256 @@
+"""
+closed.py
+Closed / maximal itemsets and non-redundant rules:
+- charm() mines the closed itemsets (no superset with the same support)
+  directly on the ECLAT bitsets: members of an equivalence class with the
+  same tidset are merged, members whose tidset is contained in another's
+  absorb it, and an itemset is kept only if no closed superset found so far
+  has the same support and transactions
+- closed_itemsets() / maximal_itemsets() filter a support / itemsets frame
+  (e.g. the FP-Growth output); maximal itemsets have no frequent superset
+- non_redundant_rules() builds the min-max basis: rules g -> f \\ g from a
+  minimal generator g to a closed superset f. Any rule A -> C has one with
+  g in A, C in f and the same support and confidence, so matching sessions
+  still get the same predictions from far fewer rules
+- generate_rules() gives the rules the mining jobs write: the non-redundant
+  ones, or every rule when asked for
+
+Supports of other itemsets are read off the closed ones: the support of an
+itemset is the largest support among the closed itemsets containing it.
+"""
+
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from usedAlgorithme.eclat import bitsets, frequent_items, popcount, vertical_matrix
+from usedAlgorithme.rules import ALL_METRICS, association_rules, compute_metric
+
+
+def _charm_class(members, min_count, closed):
+    """
+    CHARM on one equivalence class.
+    members: list of [itemset (frozenset of columns), tidset words, support],
+    sorted by increasing support. Closed itemsets go to closed as
+    {(support, tidset hash): [(itemset, support), ...]}.
+    """
+    i = 0
+    while i < len(members):
+        itemset, words, support = members[i]
+        children = []
+        j = i + 1
+        while j < len(members):
+            other, other_words, other_support = members[j]
+            tids = words & other_words
+            count = int(popcount(tids))
+            if count == support and count == other_support:
+                # Same transactions: one itemset
+                itemset = itemset | other
+                del members[j]
+                continue
+            if count == support:
+                # t(X) in t(Y): X always comes with Y
+                itemset = itemset | other
+            elif count == other_support:
+                # t(Y) in t(X): Y is only found below X
+                children.append([itemset | other, tids, count])
+                del members[j]
+                continue
+            elif count >= min_count:
+                children.append([itemset | other, tids, count])
+            j += 1
+
+        for child in children:
+            child[0] = child[0] | itemset
+        if children:
+            children.sort(key=lambda member: member[2])
+            _charm_class(children, min_count, closed)
+
+        key = (support, hash(words.tobytes()))
+        if not any(itemset <= found for found, _ in closed[key]):
+            closed[key].append((itemset, support))
+        i += 1
+
+
+def charm(data, min_support=0.01):
+    """
+    Closed frequent itemsets (CHARM).
+    data: one-hot encoded frame (dense or sparse), Transactions or lists of paths.
+    Returns a support / itemsets frame sorted by support.
+    """
+    matrix, names = vertical_matrix(data)
+    n_transactions = matrix.shape[0]
+    min_count = min_support * n_transactions
+
+    columns, supports = frequent_items(matrix, min_count)
+    words = bitsets(matrix, columns)
+    members = [[frozenset([int(c)]), words[k], int(supports[k])] for k, c in enumerate(columns)]
+    members.sort(key=lambda member: member[2])
+
+    closed = defaultdict(list)
+    _charm_class(members, min_count, closed)
+
+    found = [entry for entries in closed.values() for entry in entries]
+    frame = pd.DataFrame({
+        'support': [support / n_transactions for _, support in found],
+        'itemsets': [frozenset(names[c] for c in itemset) for itemset, _ in found],
+    })
+    return frame.sort_values('support', ascending=False, kind='stable').reset_index(drop=True)
+
+
+class ClosedIndex:
+    """
+    Closed itemsets with an inverted index, to find the ones containing an itemset.
+    Itemsets are ordered by decreasing support and the index keeps, for each
+    item, the set of itemsets containing it as the bits of an int.
+    """
+
+    def __init__(self, closed):
+        order = np.argsort(-np.asarray(closed['support'], dtype=float), kind='stable')
+        itemsets = list(closed['itemsets'])
+        self.itemsets = [itemsets[k] for k in order]
+        self.supports = np.asarray(closed['support'], dtype=float)[order].tolist()
+        masks = defaultdict(int)
+        for k, itemset in enumerate(self.itemsets):
+            for item in itemset:
+                masks[item] |= 1 << k
+        self.masks = dict(masks)
+        self.everything = (1 << len(self.itemsets)) - 1
+        self._support = {}
+
+    def containing_mask(self, itemset):
+        mask = self.everything
+        for item in itemset:
+            mask &= self.masks.get(item, 0)
+            if not mask:
+                break
+        return mask
+
+    def containing(self, itemset):
+        """Positions of the closed itemsets that contain itemset, by decreasing support"""
+        mask = self.containing_mask(itemset)
+        if not mask:
+            return []
+        data = np.frombuffer(mask.to_bytes((mask.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+        nonzero = np.flatnonzero(data)
+        rows, bits = np.nonzero(np.unpackbits(data[nonzero, None], axis=1, bitorder='little'))
+        return (nonzero[rows] * 8 + bits).tolist()
+
+    def support(self, itemset):
+        """Support of any itemset (0 if it is not frequent)"""
+        itemset = frozenset(itemset)
+        support = self._support.get(itemset)
+        if support is None:
+            mask = self.containing_mask(itemset)
+            # The first (most supported) closed itemset containing it
+            support = self.supports[(mask & -mask).bit_length() - 1] if mask else 0.0
+            self._support[itemset] = support
+        return support
+
+
+def closed_itemsets(frequent_itemsets):
+    """Closed itemsets of a support / itemsets frame (no superset with the same support)"""
+    supports = dict(zip(frequent_itemsets['itemsets'], frequent_itemsets['support']))
+    not_closed = set()
+    for itemset, support in supports.items():
+        for item in itemset:
+            subset = itemset - {item}
+            if subset and supports.get(subset) == support:
+                not_closed.add(subset)
+    keep = [itemset not in not_closed for itemset in frequent_itemsets['itemsets']]
+    return frequent_itemsets[keep].reset_index(drop=True)
+
+
+def maximal_itemsets(itemsets):
+    """
+    Maximal itemsets (no frequent superset) of a frequent or closed itemsets
+    frame; every maximal itemset is closed, so the closed ones are enough.
+    """
+    index = ClosedIndex(itemsets)
+    keep = [index.containing_mask(itemset).bit_count() == 1 for itemset in itemsets['itemsets']]
+    return itemsets[keep].reset_index(drop=True)
+
+
+def _generators(itemset, support, index):
+    """
+    Minimal generators of a closed itemset: smallest subsets with its support.
+    Searched level-wise over key itemsets (support below every subset's).
+    """
+    items = sorted(itemset)
+    # Every subset one item smaller is more frequent: the itemset is its only generator
+    if all(index.support(itemset - {item}) > support for item in items):
+        return [itemset]
+
+    generators = []
+    level = [((item,), index.support((item,))) for item in items]
+    parent_support = 1.0
+    level = [(g, s) for g, s in level if s < parent_support]
+    while level:
+        keys = []
+        for g, s in level:
+            if s == support:
+                generators.append(frozenset(g))
+            else:
+                keys.append(g)
+
+        present = set(keys)
+        next_level = []
+        for a in range(len(keys)):
+            for b in range(a + 1, len(keys)):
+                if keys[a][:-1] != keys[b][:-1]:
+                    continue
+                candidate = keys[a] + keys[b][-1:]
+                subsets = [candidate[:k] + candidate[k + 1:] for k in range(len(candidate))]
+                if not all(subset in present for subset in subsets):
+                    continue
+                s = index.support(candidate)
+                if all(s < index.support(subset) for subset in subsets):
+                    next_level.append((candidate, s))
+        level = next_level
+    return generators
+
+
+def non_redundant_rules(closed, min_confidence=0.5):
+    """
+    Min-max basis of the rules with confidence >= min_confidence, from a
+    closed itemsets frame (charm or closed_itemsets). Same columns as
+    association_rules.
+    """
+    index = ClosedIndex(closed)
+    antecedents, consequents, sA, sAC = [], [], [], []
+    for itemset, support in zip(index.itemsets, index.supports):
+        for generator in _generators(itemset, support, index):
+            # Closed supersets by decreasing support, i.e. decreasing confidence
+            for k in index.containing(generator):
+                if index.supports[k] < min_confidence * support:
+                    break
+                superset = index.itemsets[k]
+                if superset == generator:
+                    continue
+                antecedents.append(generator)
+                consequents.append(superset - generator)
+                sA.append(support)
+                sAC.append(index.supports[k])
+
+    columns = ['antecedents', 'consequents'] + ALL_METRICS
+    if not antecedents:
+        return pd.DataFrame(columns=columns)
+    sA, sAC = np.array(sA), np.array(sAC)
+    sC = np.array([index.support(c) for c in consequents])
+
+    rules = pd.DataFrame({'antecedents': antecedents, 'consequents': consequents})
+    for name in ALL_METRICS:
+        rules[name] = compute_metric(name, sAC, sA, sC)
+    return rules[columns]
+
+
+def generate_rules(frequent_itemsets, min_confidence=0.5, all_rules=False):
+    """
+    Rules of the frequent itemsets, only the non-redundant ones unless all_rules
+    (as the notebooks write them). The full rule set is only generated when
+    asked for: it is the most expensive step.
+    """
+    if all_rules:
+        return association_rules(frequent_itemsets, metric="confidence", min_threshold=min_confidence)
+    return non_redundant_rules(closed_itemsets(frequent_itemsets), min_confidence=min_confidence)
@@ -0,0 +1,234 @@
+"""
+eclat.py
+ECLAT frequent itemset mining on packed bitsets:
+- Each item's tidset is a row of uint64 words (one bit per transaction),
+  supports are counted with popcount
+- Every equivalence class (itemsets sharing a prefix) is intersected in one
+  vectorized step against all its members
+- Dense classes switch to diffsets (dEclat): members store the transactions
+  they lose relative to the prefix instead of the ones they keep
+- Class bitsets are projected onto the words that are not all zero,
+  so they shrink as the search goes deeper
+- With workers > 1 the first-level equivalence classes are mined in a process
+  pool; the item bitsets are placed in shared memory instead of being pickled,
+  and the largest classes are scheduled first
+
+eclat() returns the same support / itemsets frame as the manual implementation
+the ECLAT notebook used, itemsets listed in the same order.
+"""
+
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from usedAlgorithme.mining import encode_sparse
+from cleanningData.transactions import Transactions
+
+
+TIDSET = 0
+DIFFSET = 1
+
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        """Number of set bits in each row of a uint64 array"""
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Number of set bits in each row of a uint64 array"""
+        as_bytes = words.view(np.uint8).reshape(words.shape[:-1] + (-1,))
+        return _BYTE_COUNTS[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+def vertical_matrix(data):
+    """
+    CSC matrix (transactions x items) and item names of an encoded frame
+    (dense or sparse), a Transactions object or lists of paths.
+    """
+    if isinstance(data, pd.DataFrame):
+        if hasattr(data, 'sparse') and data.size > 0:
+            matrix = data.sparse.to_coo()
+        else:
+            matrix = sparse.coo_matrix(data.to_numpy(dtype=bool))
+        return sparse.csc_matrix(matrix, dtype=bool), list(data.columns)
+
+    if not isinstance(data, Transactions):
+        data = list(data)
+    matrix, columns = encode_sparse(data)
+    return matrix.tocsc(), columns
+
+
+def bitsets(matrix, columns):
+    """
+    Packed tidsets (len(columns) x words, uint64) of the given matrix columns.
+    """
+    n_rows = matrix.shape[0]
+    n_words = max((n_rows + 63) // 64, 1)
+    words = np.zeros((len(columns), n_words * 8), dtype=np.uint8)
+    column_bits = np.zeros(n_words * 64, dtype=bool)
+    for k, j in enumerate(columns):
+        rows = matrix.indices[matrix.indptr[j]:matrix.indptr[j + 1]]
+        column_bits[:] = False
+        column_bits[rows] = True
+        words[k] = np.packbits(column_bits)
+    return words.view(np.uint64)
+
+
+def _project(words):
+    """Drop the words that are zero in every row."""
+    nonzero = np.flatnonzero(np.bitwise_or.reduce(words, axis=0))
+    return np.ascontiguousarray(words[:, nonzero])
+
+
+def extend(words, supports, mode, i, min_count):
+    """
+    Children of member i of an equivalence class: the itemsets formed with
+    every later member. Returns (member positions, supports, words, mode)
+    of the frequent ones, as a new class.
+    """
+    if mode == TIDSET:
+        tids = words[i] & words[i + 1:]
+        child_supports = popcount(tids)
+        frequent = np.flatnonzero(child_supports >= min_count)
+        child_supports = child_supports[frequent]
+        if len(frequent) == 0:
+            return frequent, child_supports, None, mode
+
+        # Dense class: the diffsets are smaller than the tidsets
+        if child_supports.sum() > (supports[i] - child_supports).sum():
+            diffs = words[i] & ~words[i + 1:][frequent]
+            return frequent, child_supports, _project(diffs), DIFFSET
+        return frequent, child_supports, _project(tids[frequent]), TIDSET
+
+    # d(PXY) = d(PY) - d(PX), support(PXY) = support(PX) - |d(PXY)|
+    diffs = words[i + 1:] & ~words[i]
+    child_supports = supports[i] - popcount(diffs)
+    frequent = np.flatnonzero(child_supports >= min_count)
+    child_supports = child_supports[frequent]
+    if len(frequent) == 0:
+        return frequent, child_supports, None, mode
+    return frequent, child_supports, _project(diffs[frequent]), DIFFSET
+
+
+def mine_class(items, words, supports, mode, min_count, out, prefix=(), max_len=None):
+    """
+    Depth-first mining of one equivalence class.
+    Appends (itemset as a tuple of item ids, support count) to out,
+    in the order of the recursive ECLAT. Itemsets stop at max_len items.
+    """
+    for i in range(len(items)):
+        itemset = prefix + (items[i],)
+        out.append((itemset, int(supports[i])))
+        if max_len is not None and len(itemset) >= max_len:
+            continue
+
+        frequent, child_supports, child_words, child_mode = extend(words, supports, mode, i, min_count)
+        if len(frequent) > 0:
+            child_items = [items[i + 1 + k] for k in frequent]
+            mine_class(child_items, child_words, child_supports, child_mode, min_count, out, itemset, max_len)
+
+
+def frequent_items(matrix, min_count):
+    """Columns of the items meeting min_count (in column order) and their support counts"""
+    counts = np.diff(matrix.indptr)
+    frequent = np.flatnonzero(counts >= min_count)
+    return frequent, counts[frequent].astype(np.int64)
+
+
+def to_frame(found, names, n_transactions):
+    """support / itemsets frame sorted by support, like mlxtend's output"""
+    result_df = pd.DataFrame({
+        'support': [count / n_transactions for _, count in found],
+        'itemsets': [frozenset(names[i] for i in itemset) for itemset, _ in found],
+    })
+    return result_df.sort_values('support', ascending=False).reset_index(drop=True)
+
+
+# Item bitsets shared with the worker processes
+_shared = {}
+
+
+def _init_worker(name, shape, items, supports, min_count, max_len):
+    # Pool workers share the parent's resource tracker, which unlinks the segment
+    memory = shared_memory.SharedMemory(name=name)
+    _shared['memory'] = memory
+    _shared['words'] = np.ndarray(shape, dtype=np.uint64, buffer=memory.buf)
+    _shared['items'] = items
+    _shared['supports'] = supports
+    _shared['min_count'] = min_count
+    _shared['max_len'] = max_len
+
+
+def _mine_first_level(i):
+    """Worker: everything below the first-level itemset {items[i]}."""
+    words, items, supports = _shared['words'], _shared['items'], _shared['supports']
+    min_count, max_len = _shared['min_count'], _shared['max_len']
+
+    found = []
+    if max_len is not None and max_len < 2:
+        return i, found
+    frequent, child_supports, child_words, child_mode = extend(words, supports, TIDSET, i, min_count)
+    if len(frequent) > 0:
+        child_items = [items[i + 1 + k] for k in frequent]
+        mine_class(child_items, child_words, child_supports, child_mode, min_count, found, (items[i],), max_len)
+    return i, found
+
+
+def mine_parallel(items, words, supports, min_count, workers, max_len=None):
+    """
+    Mine the first-level equivalence classes in a process pool.
+    Classes are handed out one at a time, largest estimated first, so idle
+    workers keep pulling work; results are put back in sequential order.
+    """
+    memory = shared_memory.SharedMemory(create=True, size=max(words.nbytes, 1))
+    shared_words = None
+    try:
+        shared_words = np.ndarray(words.shape, dtype=np.uint64, buffer=memory.buf)
+        shared_words[:] = words
+
+        # Estimated class size: support times the number of candidate extensions
+        cost = supports * (len(items) - 1 - np.arange(len(items)))
+        order = [int(i) for i in np.argsort(-cost, kind='stable')]
+
+        below = {}
+        init_args = (memory.name, words.shape, items, supports, min_count, max_len)
+        with Pool(workers, initializer=_init_worker, initargs=init_args) as pool:
+            for i, found in pool.imap_unordered(_mine_first_level, order):
+                below[i] = found
+
+        found = []
+        for i in range(len(items)):
+            found.append(((items[i],), int(supports[i])))
+            found.extend(below[i])
+        return found
+    finally:
+        # The view must go before the buffer can be closed
+        shared_words = None
+        memory.close()
+        memory.unlink()
+
+
+def eclat(data, min_support=0.01, workers=1, max_len=None):
+    """
+    Eclat algorithm for frequent itemset mining.
+    data: one-hot encoded frame (dense or sparse), Transactions or lists of paths.
+    workers: number of processes mining the first-level equivalence classes.
+    max_len: largest itemset size (None = unlimited).
+    """
+    matrix, names = vertical_matrix(data)
+    n_transactions = matrix.shape[0]
+    min_count = min_support * n_transactions
+
+    columns, supports = frequent_items(matrix, min_count)
+    words = bitsets(matrix, columns)
+
+    if workers > 1 and len(columns) > 1:
+        found = mine_parallel([int(c) for c in columns], words, supports, min_count, workers, max_len)
+    else:
+        found = []
+        mine_class(list(columns), words, supports, TIDSET, min_count, found, max_len=max_len)
+    return to_frame(found, names, n_transactions)
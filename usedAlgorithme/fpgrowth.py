@@ -0,0 +1,361 @@
+"""
+fpgrowth.py
+FP-Growth frequent itemset mining on the integer transactions:
+- Builds the FP-tree straight from the transaction arrays (no one-hot encoding)
+- Stores each tree as flat arrays (item, count, parent per node)
+- Mines conditional pattern bases recursively, from the least frequent item up;
+  single-path trees are enumerated directly
+- Keeps the trees alive at once (a tree and the conditional trees mined from
+  it, down the recursion) under one node budget: a database whose tree would
+  exceed what is left of it is spilled to disk as per-item partitions
+  (partition projection) which are then mined one at a time
+- Databases are emptied once turned into a tree or spilled, so that no
+  caller keeps them in memory meanwhile
+
+fpgrowth() returns a support / itemsets frame like mlxtend's fpgrowth.
+Candidates are counted per itemset size (2 and more): the items whose support
+is counted in each conditional pattern base and the itemsets read off
+single-path trees.
+"""
+
+import math
+import os
+import shutil
+import tempfile
+from collections import Counter
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from cleanningData.transactions import Transactions
+from usedAlgorithme.mining import from_lists
+
+
+# Approximate memory used by one tree node (item, parent, count)
+NODE_BYTES = 4 + 4 + 8
+
+
+class TreeTooLarge(Exception):
+    """The FP-tree of a database would exceed the memory budget."""
+
+
+class FPTree:
+    """
+    FP-tree as flat arrays. Node 0 is the root; node i holds item[i],
+    count[i] and parent[i]. Items are ranks (0 = most frequent), so every
+    path from the root has increasing items.
+    """
+
+    def __init__(self, item, count, parent):
+        self.item = item
+        self.count = count
+        self.parent = parent
+        # Nodes of each item, grouped
+        nodes = np.arange(1, len(item))
+        order = np.argsort(item[1:], kind='stable')
+        self._nodes = nodes[order]
+        self._items = item[1:][order]
+
+    @classmethod
+    def build(cls, sequences, max_nodes=None):
+        """
+        Build a tree from {sequence of increasing ranks: weight}.
+        Sequences are inserted in lexicographic order, so each one shares
+        its prefix with the previous insertion and no child lookup is needed.
+        """
+        item, count, parent = [-1], [0], [-1]
+        stack = [0]
+        previous = ()
+        for sequence in sorted(sequences):
+            weight = sequences[sequence]
+            common = 0
+            limit = min(len(sequence), len(previous))
+            while common < limit and sequence[common] == previous[common]:
+                common += 1
+
+            del stack[common + 1:]
+            for node in stack[1:]:
+                count[node] += weight
+            for rank in sequence[common:]:
+                item.append(rank)
+                count.append(weight)
+                parent.append(stack[-1])
+                stack.append(len(item) - 1)
+
+            if max_nodes is not None and len(item) > max_nodes:
+                raise TreeTooLarge()
+            previous = sequence
+
+        return cls(np.asarray(item, dtype=np.int32), np.asarray(count, dtype=np.int64),
+                   np.asarray(parent, dtype=np.int32))
+
+    def __len__(self):
+        return len(self.item)
+
+    def supports(self, n_ranks):
+        """Support count of every rank in the tree"""
+        return np.bincount(self.item[1:], weights=self.count[1:], minlength=n_ranks).astype(np.int64)
+
+    def is_single_path(self):
+        return bool(np.all(self.parent[1:] == np.arange(len(self) - 1)))
+
+    def pattern_base(self, rank, n_ranks, min_count):
+        """
+        Conditional pattern base of an item, restricted to the items frequent
+        within it: {prefix path: count} over the item's nodes, and the number
+        of items counted in it.
+        Prefix paths are collected one tree level at a time for all nodes at once.
+        """
+        start, end = np.searchsorted(self._items, [rank, rank + 1])
+        nodes = self._nodes[start:end]
+        weights = self.count[nodes]
+
+        levels = []
+        p = self.parent[nodes]
+        while True:
+            alive = p > 0
+            if not alive.any():
+                break
+            levels.append(np.where(alive, self.item[p], -1))
+            p = np.where(alive, self.parent[p], 0)
+        if not levels:
+            return Counter(), 0
+
+        # One row per node, ancestors from the root down, -1 as padding
+        paths = np.stack(levels[::-1], axis=1)
+        valid = paths >= 0
+        supports = np.bincount(paths[valid], weights=np.broadcast_to(weights[:, None], paths.shape)[valid],
+                               minlength=n_ranks)
+        keep = valid & (supports >= min_count)[np.where(valid, paths, 0)]
+
+        base = Counter()
+        values = paths[keep].tolist()
+        position = 0
+        for length, weight in zip(keep.sum(axis=1).tolist(), weights.tolist()):
+            if length:
+                base[tuple(values[position:position + length])] += weight
+                position += length
+        return base, int(np.count_nonzero(supports))
+
+
+def _filter(sequences, n_ranks, min_count):
+    """
+    Drop the items that are not frequent within a conditional database.
+    Returns the filtered database and the number of items counted.
+    """
+    supports = np.zeros(n_ranks, dtype=np.int64)
+    for sequence, weight in sequences.items():
+        supports[list(sequence)] += weight
+    frequent = supports >= min_count
+
+    filtered = Counter()
+    for sequence, weight in sequences.items():
+        kept = tuple(rank for rank in sequence if frequent[rank])
+        if kept:
+            filtered[kept] += weight
+    return filtered, int(np.count_nonzero(supports))
+
+
+class Miner:
+    """
+    Recursive FP-Growth over ranked items, with spilling to disk.
+    Found itemsets are appended to out as (tuple of ranks, support count),
+    candidates counts the itemsets considered per size. max_nodes bounds the
+    nodes of all the trees on the recursion stack (live_nodes).
+    """
+
+    def __init__(self, n_ranks, min_count, max_nodes=None, spill_dir=None):
+        self.n_ranks = n_ranks
+        self.min_count = min_count
+        self.max_nodes = max_nodes
+        self.spill_dir = spill_dir
+        self.out = []
+        self.spilled = 0
+        self.live_nodes = 0
+        self.candidates = Counter()
+
+    def mine_database(self, sequences, prefix=()):
+        """
+        Mine {sequence: weight} (already restricted to frequent items).
+        sequences is emptied once built into a tree or spilled.
+        """
+        if not sequences:
+            return
+        max_nodes = None if self.max_nodes is None else max(self.max_nodes - self.live_nodes, 1)
+        try:
+            tree = FPTree.build(sequences, max_nodes)
+        except TreeTooLarge:
+            self.mine_partitioned(sequences, prefix)
+            return
+        sequences.clear()
+        self.live_nodes += len(tree)
+        try:
+            self.mine_tree(tree, prefix)
+        finally:
+            self.live_nodes -= len(tree)
+
+    def mine_tree(self, tree, prefix):
+        if tree.is_single_path():
+            # Every combination of the path's nodes, with the count of its deepest node
+            ranks, counts = tree.item[1:].tolist(), tree.count[1:].tolist()
+            for size in range(1, len(ranks) + 1):
+                if size > 1:
+                    self.candidates[len(prefix) + size] += math.comb(len(ranks), size)
+                for combination in combinations(range(len(ranks)), size):
+                    itemset = prefix + tuple(ranks[k] for k in combination)
+                    self.out.append((itemset, counts[combination[-1]]))
+            return
+
+        supports = tree.supports(self.n_ranks)
+        for rank in np.flatnonzero(supports >= self.min_count)[::-1]:
+            itemset = prefix + (int(rank),)
+            self.out.append((itemset, int(supports[rank])))
+            base, counted = tree.pattern_base(rank, self.n_ranks, self.min_count)
+            self.candidates[len(itemset) + 1] += counted
+            self.mine_database(base, itemset)
+
+    def mine_partitioned(self, sequences, prefix):
+        """
+        Partition projection: every sequence goes to the partition of its last
+        (least frequent) item. Partitions are mined from the least frequent item
+        up; after mining item x, its sequences minus x move on to the partition
+        of their new last item.
+        """
+        self.spilled += 1
+        directory = tempfile.mkdtemp(prefix='fpgrowth-', dir=self.spill_dir)
+        try:
+            partitions = _Partitions(directory)
+            for sequence, weight in sequences.items():
+                partitions.add(sequence, weight)
+            sequences.clear()
+
+            for rank in range(self.n_ranks - 1, -1, -1):
+                part = partitions.read(rank)
+                if not part:
+                    continue
+                support = sum(part.values())
+                if support < self.min_count:
+                    continue
+
+                itemset = prefix + (rank,)
+                self.out.append((itemset, support))
+
+                rest = Counter()
+                for sequence, weight in part.items():
+                    if len(sequence) > 1:
+                        rest[sequence[:-1]] += weight
+                del part
+                base, counted = _filter(rest, self.n_ranks, self.min_count)
+                self.candidates[len(itemset) + 1] += counted
+                # Back to disk before mining: they go to the partitions of lower ranks
+                for sequence, weight in rest.items():
+                    partitions.add(sequence, weight)
+                del rest
+                self.mine_database(base, itemset)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+class _Partitions:
+    """
+    Per-item partitions on disk: records of int64 [length, weight, ranks...]
+    appended to one file per last item.
+    """
+
+    def __init__(self, directory, buffer_size=1 << 16):
+        self.directory = directory
+        self.buffer_size = buffer_size
+        self.buffers = {}
+
+    def _path(self, rank):
+        return os.path.join(self.directory, f'{rank}.bin')
+
+    def add(self, sequence, weight):
+        rank = sequence[-1]
+        buffer = self.buffers.setdefault(rank, [])
+        buffer.append(len(sequence))
+        buffer.append(weight)
+        buffer.extend(sequence)
+        if len(buffer) >= self.buffer_size:
+            self._flush(rank)
+
+    def _flush(self, rank):
+        with open(self._path(rank), 'ab') as f:
+            np.asarray(self.buffers.pop(rank), dtype=np.int64).tofile(f)
+
+    def read(self, rank):
+        if rank in self.buffers:
+            self._flush(rank)
+        path = self._path(rank)
+        if not os.path.exists(path):
+            return Counter()
+        records = np.fromfile(path, dtype=np.int64).tolist()
+        os.remove(path)
+
+        sequences = Counter()
+        i = 0
+        while i < len(records):
+            length, weight = records[i], records[i + 1]
+            sequences[tuple(records[i + 2:i + 2 + length])] += weight
+            i += 2 + length
+        return sequences
+
+
+def ranked_sequences(transactions, min_count):
+    """
+    Transactions as {sequence of ranks: weight}, keeping frequent items only.
+    Returns (sequences, item id of each rank, support of each rank).
+    """
+    unique = transactions.unique()
+    items = np.asarray(unique.items, dtype=np.int64)
+    counts = np.bincount(items, minlength=unique.n_items)
+
+    # Rank 0 is the most frequent item
+    frequent = np.flatnonzero(counts >= min_count)
+    rank_items = frequent[np.lexsort((frequent, -counts[frequent]))]
+    rank_of = np.full(unique.n_items, -1, dtype=np.int64)
+    rank_of[rank_items] = np.arange(len(rank_items))
+
+    rows = unique.session_ids()
+    ranks = rank_of[items]
+    keep = ranks >= 0
+    rows, ranks = rows[keep], ranks[keep]
+    order = np.lexsort((ranks, rows))
+    rows, ranks = rows[order], ranks[order]
+
+    boundaries = np.flatnonzero(np.diff(rows)) + 1
+    sequences = Counter(tuple(part) for part in np.split(ranks, boundaries) if len(part) > 0) \
+        if len(ranks) > 0 else Counter()
+    return sequences, rank_items, counts[rank_items]
+
+
+def fpgrowth(data, min_support=0.01, memory_budget=None, spill_dir=None, stats=None):
+    """
+    FP-Growth frequent itemset mining.
+    data: Transactions (integer arrays) or lists of paths.
+    memory_budget: bytes allowed for the FP-trees alive at once (None =
+    unlimited); a database whose tree does not fit in what is left is mined
+    from partitions spilled to spill_dir (default: system temp).
+    stats: optional dict, filled with the candidates per itemset size of 2
+    and more ('candidates') and the number of spilled databases ('spilled').
+    """
+    if not isinstance(data, Transactions):
+        data = from_lists(data)
+    n_transactions = len(data)
+    min_count = min_support * n_transactions
+
+    sequences, rank_items, _ = ranked_sequences(data, min_count)
+    max_nodes = None if memory_budget is None else max(int(memory_budget // NODE_BYTES), 1)
+
+    miner = Miner(len(rank_items), min_count, max_nodes, spill_dir)
+    miner.mine_database(sequences)
+    if stats is not None:
+        stats['candidates'] = dict(miner.candidates)
+        stats['spilled'] = miner.spilled
+
+    names = [data.paths[i] for i in rank_items]
+    return pd.DataFrame({
+        'support': [count / n_transactions for _, count in miner.out],
+        'itemsets': [frozenset(names[r] for r in itemset) for itemset, _ in miner.out],
+    })
@@ -0,0 +1,355 @@
+"""
+incremental.py
+Incremental re-mining of the frequent itemsets when new cleaned sessions arrive
+(FUP with a negative border):
+- The state keeps the support count of every frequent itemset and of its
+  negative border (the infrequent itemsets whose subsets are all frequent)
+- A new batch of transactions (e.g. one day) is only counted against those
+  itemsets, with bitsets as in eclat.py
+- Itemsets outside the state were infrequent before, so their old count is
+  below the old threshold: that bound plus their count in the new batch tells
+  whether they can have become frequent. Only those that can are counted in
+  the older batches, which happens only when the negative border is crossed
+- Every batch is kept in the state directory (integer arrays) for those scans
+- Each batch first loses the paths the algorithm's notebook leaves out
+  (DROPPED_PATHS, as in pipeline.py), recorded in the state so that every
+  later batch loses the same ones
+
+Apriori, FP-Growth and ECLAT find the same frequent itemsets for a given
+min_support and the same input. FP-Growth and ECLAT leave out the same
+paths and share one state (Data/incremental/fp_growth/), Apriori has its
+own (Data/incremental/apriori/). The updated itemsets and rules are written
+to the outputs of the algorithms of each state (the non-redundant rules
+unless --all-rules, as pipeline.py writes them), with fresh run metadata
+(candidates: the frequent itemsets and negative border the state counts; no
+peak memory, the run is shared).
+
+Usage (from the project root):
+    python -m usedAlgorithme.incremental Data/extractedAndcleanedData/cleaned_data.csv
+        (first run: mines the whole history and creates the state)
+    python -m usedAlgorithme.incremental Data/extractedAndcleanedData/new_day.csv
+    python -m usedAlgorithme.incremental Data/extractedAndcleanedData/new_day.csv --algorithms fp_growth ECLAT
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import time
+from collections import Counter, defaultdict
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+
+from cleanningData.transactions import load_transactions as load_arrays
+from usedAlgorithme.closed import generate_rules
+from usedAlgorithme.eclat import bitsets, popcount
+from usedAlgorithme.mining import DROPPED_PATHS, encode_sparse, read_transactions_csv, without_paths
+from usedAlgorithme.rule_store import RuleStore, run_metadata, save_frame, save_metadata, store_path
+
+
+STATE_DIR = 'Data/incremental'
+STATE_FILE = 'state.json'
+COUNTS_DIR = 'itemsets'
+HISTORY_DIR = 'history'
+
+# (frequent itemsets CSV, rules CSV) written by each algorithm's notebook
+OUTPUTS = {
+    'apriori': (None, 'Data/apriori/apriori_rules.csv'),
+    'fp_growth': ('Data/fp_growth/fp_frequent_itemsets.csv', 'Data/fp_growth/fp_rules.csv'),
+    'ECLAT': ('Data/ECLAT/ECLAT_frequent_itemsets.csv', 'Data/ECLAT/ECLAT_rules.csv'),
+}
+
+# Bytes of bitsets gathered at once when counting itemsets
+COUNT_BATCH_BYTES = 64 << 20
+
+
+class ItemsetCounter:
+    """
+    Support counts of arbitrary itemsets (of paths) in a set of transactions.
+    With paths, only those paths get a bitset (other paths count as absent).
+    """
+
+    def __init__(self, transactions, paths=None):
+        matrix, columns = encode_sparse(transactions)
+        self.n_transactions = matrix.shape[0]
+        if paths is not None:
+            paths = set(paths)
+            kept = [i for i, path in enumerate(columns) if path in paths]
+        else:
+            kept = range(len(columns))
+        self.column_of = {columns[i]: k for k, i in enumerate(kept)}
+        self.words = bitsets(matrix.tocsc(), kept)
+
+    def count(self, itemsets):
+        counts = np.zeros(len(itemsets), dtype=np.int64)
+        by_size = defaultdict(list)
+        for i, itemset in enumerate(itemsets):
+            columns = [self.column_of.get(path) for path in itemset]
+            # A path absent from these transactions: count 0
+            if None not in columns:
+                by_size[len(columns)].append((i, columns))
+
+        for size, group in by_size.items():
+            batch = max(COUNT_BATCH_BYTES // (size * self.words.shape[1] * 8), 1)
+            for start in range(0, len(group), batch):
+                part = group[start:start + batch]
+                rows = np.array([columns for _, columns in part], dtype=np.int64)
+                tids = np.bitwise_and.reduce(self.words[rows], axis=1)
+                counts[[i for i, _ in part]] = popcount(tids)
+        return counts
+
+
+def apriori_gen(itemsets):
+    """
+    Candidates one item larger than the given itemsets (sorted tuples)
+    whose subsets are all among them.
+    """
+    present = set(itemsets)
+    by_prefix = defaultdict(list)
+    for itemset in sorted(itemsets):
+        by_prefix[itemset[:-1]].append(itemset[-1])
+
+    candidates = []
+    for prefix, lasts in by_prefix.items():
+        for a, b in combinations(lasts, 2):
+            candidate = prefix + (a, b)
+            if all(candidate[:k] + candidate[k + 1:] in present for k in range(len(prefix))):
+                candidates.append(candidate)
+    return candidates
+
+
+def state_name(algorithm):
+    """State directory name of an algorithm: the first algorithm leaving out the same paths"""
+    return next(name for name in OUTPUTS if DROPPED_PATHS[name] == DROPPED_PATHS[algorithm])
+
+
+def load_batch(source):
+    """Transactions of a cleaned_data.csv style file or of a transactions directory"""
+    if os.path.isdir(source):
+        return load_arrays(source)
+    return read_transactions_csv(source)
+
+
+class MiningState:
+    """
+    Frequent itemsets and negative border with their support counts.
+    counts maps an itemset (sorted tuple of paths) to (count, exact); inexact
+    counts are upper bounds, for border itemsets never counted in full.
+    dropped: the paths left out of every batch.
+    """
+
+    def __init__(self, directory, min_support, n_transactions=0, counts=None, batches=0, dropped=()):
+        self.directory = directory
+        self.min_support = min_support
+        self.n_transactions = n_transactions
+        self.counts = counts if counts is not None else {}
+        self.batches = batches
+        self.dropped = sorted(dropped)
+        self.history_scans = 0
+
+    @classmethod
+    def load(cls, directory=STATE_DIR):
+        with open(os.path.join(directory, STATE_FILE)) as f:
+            meta = json.load(f)
+        store = RuleStore(os.path.join(directory, COUNTS_DIR)).to_frame()
+        counts = {tuple(sorted(itemset)): (int(count), bool(exact))
+                  for itemset, count, exact in zip(store['itemsets'], store['count'], store['exact'])}
+        # States saved before 'dropped' was recorded kept every path
+        return cls(directory, meta['min_support'], meta['n_transactions'], counts, meta['batches'],
+                   meta.get('dropped', []))
+
+    def save(self):
+        itemsets = list(self.counts)
+        save_frame(pd.DataFrame({
+            'itemsets': [frozenset(itemset) for itemset in itemsets],
+            'count': [self.counts[itemset][0] for itemset in itemsets],
+            'exact': [float(self.counts[itemset][1]) for itemset in itemsets],
+        }), os.path.join(self.directory, COUNTS_DIR))
+        with open(os.path.join(self.directory, STATE_FILE), 'w') as f:
+            json.dump({
+                'min_support': self.min_support,
+                'n_transactions': self.n_transactions,
+                'batches': self.batches,
+                'dropped': self.dropped,
+            }, f, indent=1)
+
+    def min_count(self):
+        return self.min_support * self.n_transactions
+
+    def frequent_itemsets(self):
+        """support / itemsets frame of the frequent itemsets, by support"""
+        min_count = self.min_count()
+        found = [(count, itemset) for itemset, (count, _) in self.counts.items() if count >= min_count]
+        frame = pd.DataFrame({
+            'support': [count / self.n_transactions for count, _ in found],
+            'itemsets': [frozenset(itemset) for _, itemset in found],
+        })
+        return frame.sort_values('support', ascending=False, kind='stable').reset_index(drop=True)
+
+    def _count_history(self, itemsets, batch):
+        """Exact counts over every stored batch plus the new one"""
+        self.history_scans += 1
+        counts = batch.count(itemsets)
+        for k in range(self.batches):
+            counts += ItemsetCounter(load_arrays(os.path.join(self.directory, HISTORY_DIR, str(k)))).count(itemsets)
+        return counts
+
+    def update(self, transactions):
+        """Add a batch of transactions and bring the itemsets up to date."""
+        transactions = without_paths(transactions, self.dropped)
+        batch = ItemsetCounter(transactions)
+        old_min_count = self.min_count()
+        # Count any itemset that was not frequent can have had
+        old_bound = min(max(math.ceil(old_min_count) - 1, 0), self.n_transactions)
+
+        known = list(self.counts)
+        for itemset, added in zip(known, batch.count(known).tolist()):
+            count, exact = self.counts[itemset]
+            self.counts[itemset] = (count + added, exact)
+        self.n_transactions += batch.n_transactions
+        min_count = self.min_count()
+
+        # Paths never seen before: their old count is 0
+        new_paths = [(path,) for path in batch.column_of if (path,) not in self.counts]
+        for itemset, count in zip(new_paths, batch.count(new_paths).tolist()):
+            self.counts[itemset] = (count, True)
+
+        # Level-wise rebuild of the frequent itemsets and negative border
+        counts = {}
+        candidates = sorted(itemset for itemset in self.counts if len(itemset) == 1)
+        while candidates:
+            # New candidates: old count bounded by the old threshold and by their subsets
+            unknown = [itemset for itemset in candidates if itemset not in self.counts]
+            for itemset, added in zip(unknown, batch.count(unknown).tolist()):
+                bound = min([old_bound + added] + [counts[itemset[:k] + itemset[k + 1:]][0]
+                                                    for k in range(len(itemset))])
+                self.counts[itemset] = (bound, old_bound == 0)
+
+            # Bounds that reach the threshold need an exact count
+            unresolved = [itemset for itemset in candidates
+                          if not self.counts[itemset][1] and self.counts[itemset][0] >= min_count]
+            if unresolved:
+                for itemset, count in zip(unresolved, self._count_history(unresolved, batch).tolist()):
+                    self.counts[itemset] = (count, True)
+
+            for itemset in candidates:
+                counts[itemset] = self.counts[itemset]
+            frequent = [itemset for itemset in candidates if counts[itemset][0] >= min_count]
+            candidates = apriori_gen(frequent)
+
+        self.counts = counts
+        transactions.save(os.path.join(self.directory, HISTORY_DIR, str(self.batches)))
+        self.batches += 1
+
+
+def save_outputs(algorithm, frequent_itemsets, rules, metadata=None):
+    """
+    Write the frequent itemsets and rules of one algorithm (CSV and binary
+    store), plus the run metadata when given.
+    """
+    itemsets_csv, rules_csv = OUTPUTS[algorithm]
+    os.makedirs(os.path.dirname(rules_csv), exist_ok=True)
+    paths = None
+    if itemsets_csv is not None:
+        frequent_itemsets.to_csv(itemsets_csv, index=False)
+        paths = save_frame(frequent_itemsets, store_path(itemsets_csv))
+    rules.to_csv(rules_csv, index=False)
+    save_frame(rules, store_path(rules_csv), paths=paths)
+    if metadata is not None:
+        save_metadata(rules_csv, metadata)
+
+
+def write_outputs(state, min_confidence=0.5, sources=(), mining_seconds=None, algorithms=OUTPUTS,
+                  all_rules=False):
+    """
+    Write the frequent itemsets and rules of the algorithms (CSV and binary
+    store) and their run metadata; sources and mining_seconds: the batches
+    of this update and the time they took. The algorithms must leave out the
+    paths the state leaves out. Only the non-redundant rules unless all_rules.
+    """
+    for algorithm in algorithms:
+        if sorted(DROPPED_PATHS[algorithm]) != state.dropped:
+            raise ValueError(f"{algorithm} leaves out {DROPPED_PATHS[algorithm]}, the state {state.dropped}")
+    frequent_itemsets = state.frequent_itemsets()
+    started = time.perf_counter()
+    rules = generate_rules(frequent_itemsets, min_confidence, all_rules)
+    rules_seconds = time.perf_counter() - started
+
+    candidates = Counter(len(itemset) for itemset in state.counts)
+    inputs = {'source': list(sources), 'transactions': state.n_transactions, 'items': candidates.get(1, 0),
+              'batches': state.batches}
+    for algorithm in algorithms:
+        metadata = run_metadata(
+            algorithm, frequent_itemsets, rules, inputs,
+            candidates=dict(candidates),
+            min_support=state.min_support,
+            min_confidence=min_confidence,
+            mining_seconds=round(mining_seconds, 3) if mining_seconds is not None else None,
+            rules_seconds=round(rules_seconds, 3),
+            executor='incremental',
+            peak_memory_mb=None,
+            non_redundant=not all_rules,
+        )
+        save_outputs(algorithm, frequent_itemsets, rules, metadata)
+    return frequent_itemsets, rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the frequent itemsets and rules with new cleaned sessions.")
+    parser.add_argument('batches', nargs='+',
+                        help="cleaned_data.csv style files or transactions directories, oldest first")
+    parser.add_argument('--algorithms', nargs='+', default=list(OUTPUTS), choices=list(OUTPUTS),
+                        help="Outputs to update (FP-Growth and ECLAT share a state, Apriori has its own)")
+    parser.add_argument('--state', default=STATE_DIR, help="Directory of the states")
+    parser.add_argument('--min-support', type=float, default=0.01, help="Minimum support (new state only)")
+    parser.add_argument('--min-confidence', type=float, default=0.5, help="Minimum rule confidence")
+    parser.add_argument('--all-rules', action='store_true', help="Write every rule, not only the non-redundant ones")
+    parser.add_argument('--reset', action='store_true', help="Discard the existing states of these algorithms")
+    args = parser.parse_args()
+
+    groups = {}
+    for algorithm in args.algorithms:
+        groups.setdefault(state_name(algorithm), []).append(algorithm)
+
+    # One state for all three, counted with the noise paths (before the states were split)
+    legacy = os.path.join(args.state, STATE_FILE)
+    if args.reset:
+        for name in list(groups) + [COUNTS_DIR, HISTORY_DIR]:
+            shutil.rmtree(os.path.join(args.state, name), ignore_errors=True)
+        if os.path.exists(legacy):
+            os.remove(legacy)
+    if os.path.exists(legacy):
+        parser.error(f"{args.state} holds a state that kept every path: rebuild the states "
+                     f"from the full history with --reset")
+
+    for name, algorithms in groups.items():
+        directory = os.path.join(args.state, name)
+        if os.path.exists(os.path.join(directory, STATE_FILE)):
+            state = MiningState.load(directory)
+        else:
+            os.makedirs(directory, exist_ok=True)
+            state = MiningState(directory, args.min_support, dropped=DROPPED_PATHS[name])
+
+        print(f"{', '.join(algorithms)} (state {directory}):")
+        started = time.perf_counter()
+        for source in args.batches:
+            transactions = load_batch(source)
+            state.update(transactions)
+            print(f"  {source}: {len(transactions)} transactions "
+                  f"({state.n_transactions} in total, {state.history_scans} history scans)")
+        mining_seconds = time.perf_counter() - started
+        state.save()
+
+        frequent_itemsets, rules = write_outputs(state, args.min_confidence, args.batches, mining_seconds,
+                                                 algorithms, args.all_rules)
+        print(f"  - Frequent itemsets: {len(frequent_itemsets)}")
+        print(f"  - Negative border: {len(state.counts) - len(frequent_itemsets)}")
+        print(f"  - {'Association' if args.all_rules else 'Non-redundant'} rules: {len(rules)}")
+    print(f"Done!")
+
+
+if __name__ == "__main__":
+    main()
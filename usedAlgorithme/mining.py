@@ -0,0 +1,135 @@
+"""
+mining.py
+Loading and encoding of the cleaned sessions for Apriori / FP-Growth / ECLAT:
+- Reads the integer transaction arrays written by the cleaning scripts
+  when they were written with the requested file (falls back to the CSV)
+- One-hot encodes them as a scipy sparse matrix (transactions x distinct paths)
+  instead of the dense TransactionEncoder frame
+- Wraps the matrix in a pandas SparseDtype frame accepted by mlxtend's
+  apriori and fpgrowth
+- Lists the paths each algorithm leaves out (DROPPED_PATHS), shared by the
+  mining jobs and the sequence model
+
+Columns are sorted by path, like TransactionEncoder.columns_.
+"""
+
+import os
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from cleanningData.transactions import Transactions, TransactionWriter, load_transactions as load_arrays, written_from
+
+
+CLEANED_DATA = 'Data/extractedAndcleanedData/cleaned_data.csv'
+
+NOISE = ['/images', '/icons', '/htbin']
+
+# Paths each notebook removes before mining
+DROPPED_PATHS = {
+    'apriori': ['NA'],
+    'fp_growth': NOISE,
+    'ECLAT': NOISE,
+}
+
+
+def read_transactions_csv(filename, max_sessions=None):
+    """Transactions (integer arrays) from a cleaned_data.csv style file (its first max_sessions lines)"""
+    writer = TransactionWriter()
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in islice(f, max_sessions):
+            writer.add([p for p in line.strip().split(',') if p != ''])
+    return Transactions(np.frombuffer(writer.offsets, dtype=np.int64),
+                        np.frombuffer(writer.items, dtype=np.int32), writer.paths)
+
+
+def load_transactions(filename=CLEANED_DATA, max_sessions=None):
+    """
+    Cleaned sessions as Transactions, only the first max_sessions if given.
+    Uses the transactions/ arrays next to the CSV when they were written with
+    this very file (any other CSV of the directory, or one rewritten since, is
+    read as text).
+    """
+    directory = os.path.join(os.path.dirname(filename), 'transactions')
+    if written_from(directory, filename):
+        transactions = load_arrays(directory)
+        if max_sessions is None or max_sessions >= len(transactions):
+            return transactions
+        offsets = transactions.offsets[:max_sessions + 1]
+        return Transactions(offsets, transactions.items[:offsets[-1]], transactions.paths)
+    return read_transactions_csv(filename, max_sessions)
+
+
+def from_lists(transactions):
+    """Transactions from lists of paths (e.g. the notebooks' transactions_cleaned)"""
+    writer = TransactionWriter()
+    for t in transactions:
+        writer.add(t)
+    return Transactions(np.frombuffer(writer.offsets, dtype=np.int64),
+                        np.frombuffer(writer.items, dtype=np.int32), writer.paths)
+
+
+def without_paths(transactions, dropped):
+    """
+    Transactions without the dropped paths, in the path dictionary too.
+    Sessions left empty are kept: supports stay relative to every session.
+    """
+    dropped = set(dropped)
+    keep_path = np.asarray([path not in dropped for path in transactions.paths], dtype=bool)
+    if keep_path.all():
+        return transactions
+    new_id = np.cumsum(keep_path) - 1
+    items = np.asarray(transactions.items, dtype=np.int64)
+    keep = keep_path[items] if len(items) else np.zeros(0, dtype=bool)
+    rows = transactions.session_ids()[keep]
+    offsets = np.zeros(len(transactions) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(transactions)), out=offsets[1:])
+    paths = [path for path, kept in zip(transactions.paths, keep_path) if kept]
+    return Transactions(offsets, new_id[items[keep]].astype(np.int32), paths)
+
+
+def encode_sparse(transactions, min_support=None):
+    """
+    One-hot encode transactions as a boolean CSR matrix.
+    Returns (matrix, columns) with columns sorted by path.
+    With min_support, paths below it are dropped: they cannot be part of any
+    frequent itemset, and mlxtend's fpgrowth densifies its input internally.
+    """
+    if not isinstance(transactions, Transactions):
+        transactions = from_lists(transactions)
+    unique = transactions.unique()
+
+    n_rows, n_items = len(unique), unique.n_items
+    items = np.asarray(unique.items, dtype=np.int64)
+
+    keep = np.ones(n_items, dtype=bool)
+    if min_support is not None:
+        counts = np.bincount(items, minlength=n_items)
+        keep = counts >= min_support * n_rows
+
+    # Column of each kept path, in path order
+    kept = np.flatnonzero(keep)
+    kept = kept[np.argsort(np.asarray(unique.paths, dtype=object)[kept], kind='stable')]
+    column = np.full(n_items, -1, dtype=np.int64)
+    column[kept] = np.arange(len(kept))
+
+    rows = unique.session_ids()
+    cols = column[items]
+    mask = cols >= 0
+    matrix = sparse.csr_matrix(
+        (np.ones(int(mask.sum()), dtype=bool), (rows[mask], cols[mask])),
+        shape=(n_rows, len(kept)),
+    )
+    columns = [unique.paths[i] for i in kept]
+    return matrix, columns
+
+
+def sparse_frame(transactions, min_support=None):
+    """
+    SparseDtype frame for mlxtend's apriori / fpgrowth
+    (same columns as the TransactionEncoder frame, without densifying it).
+    """
+    matrix, columns = encode_sparse(transactions, min_support)
+    return pd.DataFrame.sparse.from_spmatrix(matrix, columns=columns)
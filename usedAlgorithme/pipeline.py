@@ -0,0 +1,243 @@
+"""
+pipeline.py
+Apriori, FP-Growth and ECLAT in one job (what the three notebooks do):
+- Loads the cleaned sessions once (the transactions/ arrays written with it,
+  cleaned_data.csv otherwise) and one-hot encodes them once as a CSR matrix
+- Each algorithm works on a view of that matrix, without the paths its
+  notebook leaves out (/images, /icons and /htbin for FP-Growth and ECLAT)
+- The selected algorithms run concurrently: in processes (default; each
+  worker gets the encoded matrix once) or in threads, which overlap where
+  NumPy releases the GIL (ECLAT's bitset operations)
+- Each one mines the frequent itemsets, generates the rules, keeps the
+  non-redundant ones (as the notebooks do, unless --all-rules) and writes its
+  Data/ outputs (CSV and binary store)
+- Next to each rules export, a metadata file records the run: mining time,
+  the executor, peak memory (only with the process executor, where each
+  algorithm has a process of its own; null otherwise), candidates and
+  frequent itemsets per size and the input size (read by the dashboard's
+  Comparison tab)
+
+Candidates per size are the itemsets each algorithm counts: Apriori's joined
+and pruned candidates, ECLAT's tidset intersections (pairs of frequent
+itemsets sharing their prefix) and the items of FP-Growth's conditional trees;
+at size 1, every item of the input.
+
+Usage (from the project root):
+    python -m usedAlgorithme
+    python -m usedAlgorithme --algorithms fp_growth ECLAT --min-support 0.005 --executor thread
+"""
+
+import argparse
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool
+
+import pandas as pd
+from mlxtend.frequent_patterns import apriori
+
+try:
+    import resource
+except ImportError:
+    # Windows: no peak RSS
+    resource = None
+
+from cleanningData.transactions import Transactions
+from usedAlgorithme.closed import generate_rules
+from usedAlgorithme.eclat import eclat
+from usedAlgorithme.fpgrowth import fpgrowth
+from usedAlgorithme.incremental import OUTPUTS, apriori_gen, save_outputs
+from usedAlgorithme.mining import CLEANED_DATA, DROPPED_PATHS, encode_sparse, load_transactions
+from usedAlgorithme.rule_store import run_metadata
+
+
+ALGORITHMS = list(OUTPUTS)
+
+# Encoded sessions of a process worker
+_matrix = None
+_columns = None
+
+
+def encode(filename=CLEANED_DATA):
+    """Load the cleaned sessions and one-hot encode them: (CSR matrix, columns)"""
+    return encode_sparse(load_transactions(filename))
+
+
+def select_paths(matrix, columns, dropped):
+    """Columns of the matrix without the dropped paths"""
+    dropped = set(dropped)
+    keep = [i for i, path in enumerate(columns) if path not in dropped]
+    if len(keep) == len(columns):
+        return matrix, columns
+    return matrix[:, keep], [columns[i] for i in keep]
+
+
+def mine(algorithm, matrix, columns, min_support=0.01, memory_budget=None, stats=None):
+    """
+    Frequent itemsets of an encoded matrix with one of the three algorithms.
+    stats: optional dict, gets FP-Growth's candidates per size (see fpgrowth).
+    """
+    if algorithm == 'fp_growth':
+        # CSR arrays are the Transactions layout
+        matrix = matrix.tocsr()
+        transactions = Transactions(matrix.indptr, matrix.indices, columns)
+        return fpgrowth(transactions, min_support=min_support, memory_budget=memory_budget, stats=stats)
+
+    frame = pd.DataFrame.sparse.from_spmatrix(matrix, columns=columns)
+    if algorithm == 'apriori':
+        return apriori(frame, min_support=min_support, use_colnames=True)
+    if algorithm == 'ECLAT':
+        return eclat(frame, min_support=min_support)
+    raise ValueError(f"Unknown algorithm '{algorithm}', expected one of {ALGORITHMS}")
+
+
+def reset_peak_rss():
+    """
+    Restart the peak resident memory count of this process, so that
+    peak_rss_mb() covers what follows (Linux). Returns whether it could.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB, since reset_peak_rss() if called (None where unavailable)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024, 1)
+
+
+def candidates_per_level(algorithm, frequent_itemsets, n_items, stats=None):
+    """{itemset size: candidates counted} of a run (see the module docstring)"""
+    by_size = defaultdict(list)
+    for itemset in frequent_itemsets['itemsets']:
+        by_size[len(itemset)].append(tuple(sorted(itemset)))
+
+    if algorithm == 'fp_growth':
+        candidates = Counter((stats or {}).get('candidates', {}))
+    else:
+        candidates = Counter()
+        for size in sorted(by_size):
+            if algorithm == 'apriori':
+                candidates[size + 1] = len(apriori_gen(by_size[size]))
+            else:
+                # Columns are sorted by path: ECLAT's classes share a sorted prefix
+                prefixes = Counter(itemset[:-1] for itemset in by_size[size])
+                candidates[size + 1] = sum(m * (m - 1) // 2 for m in prefixes.values())
+    candidates[1] = n_items
+    return {size: count for size, count in sorted(candidates.items()) if count > 0}
+
+
+def run(algorithm, matrix, columns, min_support=0.01, min_confidence=0.5, all_rules=False,
+        memory_budget=None, write=True, source=CLEANED_DATA, executor='serial'):
+    """
+    Mine, generate the rules and write the outputs (and run metadata) of one
+    algorithm. Returns the metadata.
+    executor: how run_all runs it; peak memory is only the algorithm's own
+    in a process of its own ('process'), and is left out otherwise.
+    """
+    own_process = executor == 'process'
+    if own_process:
+        # The worker was forked from the parent: count from here
+        reset_peak_rss()
+    started = time.perf_counter()
+    matrix, columns = select_paths(matrix, columns, DROPPED_PATHS[algorithm])
+    stats = {}
+    frequent_itemsets = mine(algorithm, matrix, columns, min_support, memory_budget, stats)
+    mined = time.perf_counter()
+
+    rules = generate_rules(frequent_itemsets, min_confidence, all_rules)
+    finished = time.perf_counter()
+
+    n_items = int((matrix.getnnz(axis=0) > 0).sum())
+    inputs = {
+        'source': source,
+        'transactions': matrix.shape[0],
+        'items': n_items,
+        'avg_length': round(matrix.nnz / max(matrix.shape[0], 1), 2),
+    }
+    metadata = run_metadata(
+        algorithm, frequent_itemsets, rules, inputs,
+        candidates=candidates_per_level(algorithm, frequent_itemsets, n_items, stats),
+        min_support=min_support,
+        min_confidence=min_confidence,
+        mining_seconds=round(mined - started, 3),
+        rules_seconds=round(finished - mined, 3),
+        executor=executor,
+        peak_memory_mb=peak_rss_mb() if own_process else None,
+        non_redundant=not all_rules,
+    )
+    if write:
+        save_outputs(algorithm, frequent_itemsets, rules, metadata)
+    return metadata
+
+
+def _init_worker(matrix, columns):
+    global _matrix, _columns
+    _matrix, _columns = matrix, columns
+
+
+def _run_in_worker(algorithm, options):
+    return run(algorithm, _matrix, _columns, **options)
+
+
+def run_all(algorithms=ALGORITHMS, filename=CLEANED_DATA, executor='process', **options):
+    """
+    Encode the sessions once and run the algorithms concurrently.
+    executor: 'process' (one new process per algorithm, so that peak memory
+    is its own, even for a single algorithm), 'thread' or 'serial'. options
+    go to run().
+    Returns (load seconds, metadata in the order of algorithms).
+    """
+    started = time.perf_counter()
+    matrix, columns = encode(filename)
+    load_seconds = time.perf_counter() - started
+    options.update(source=filename, executor=executor)
+
+    if executor == 'serial':
+        return load_seconds, [run(algorithm, matrix, columns, **options) for algorithm in algorithms]
+    if executor == 'thread':
+        with ThreadPoolExecutor(max_workers=len(algorithms)) as pool:
+            futures = [pool.submit(run, algorithm, matrix, columns, **options) for algorithm in algorithms]
+            return load_seconds, [future.result() for future in futures]
+    if executor == 'process':
+        with Pool(len(algorithms), initializer=_init_worker, initargs=(matrix, columns),
+                  maxtasksperchild=1) as pool:
+            results = [pool.apply_async(_run_in_worker, (algorithm, options)) for algorithm in algorithms]
+            return load_seconds, [result.get() for result in results]
+    raise ValueError(f"Unknown executor '{executor}', expected 'process', 'thread' or 'serial'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mine the frequent itemsets and rules of every algorithm in one job.")
+    parser.add_argument('--input', default=CLEANED_DATA, help="Cleaned transactions file")
+    parser.add_argument('--algorithms', nargs='+', default=ALGORITHMS, choices=ALGORITHMS)
+    parser.add_argument('--min-support', type=float, default=0.01)
+    parser.add_argument('--min-confidence', type=float, default=0.5)
+    parser.add_argument('--all-rules', action='store_true', help="Write every rule, not only the non-redundant ones")
+    parser.add_argument('--executor', default='process', choices=['process', 'thread', 'serial'])
+    parser.add_argument('--memory-budget', type=int, default=None, help="Bytes for the FP-trees in memory at once (FP-Growth)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    load_seconds, summaries = run_all(args.algorithms, args.input, args.executor,
+                                      min_support=args.min_support, min_confidence=args.min_confidence,
+                                      all_rules=args.all_rules, memory_budget=args.memory_budget)
+    print(f"Loaded and encoded {args.input} in {load_seconds:.2f}s")
+    for summary in summaries:
+        seconds = summary['mining_seconds'] + summary['rules_seconds']
+        peak = f", peak {summary['peak_memory_mb']} MB" if summary['peak_memory_mb'] is not None else ''
+        print(f"  - {summary['algorithm']}: {summary['itemsets']} itemsets, {summary['rules']} "
+              f"{'non-redundant ' if summary['non_redundant'] else ''}rules in {seconds:.2f}s{peak}")
+    print(f"Done in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+rule_store.py
+Compact binary storage for mined rules and frequent itemsets:
+- Paths are stored once in a path dictionary (paths.txt) and referenced by int32 ids
+- Itemset columns (antecedents, consequents, itemsets) are offset-encoded id lists
+- Numeric columns (support, confidence, lift, ...) are plain float64 arrays
+- Every array is a .npy file, so loading is a memory map with no parsing
+
+A store is a directory named after the CSV it replaces, e.g.
+Data/apriori/apriori_rules.csv -> Data/apriori/apriori_rules/
+The CSV files are still read (and parsed) when no store exists.
+Mining jobs (pipeline, incremental and streaming) also write their run
+metadata next to the rules export (Data/apriori/apriori_rules.meta.json).
+
+Usage:
+    python -m usedAlgorithme.rule_store Data/apriori/apriori_rules.csv ...
+converts existing CSV exports into stores.
+"""
+
+import json
+import os
+import re
+import sys
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+STORE_VERSION = 1
+PATHS_FILE = 'paths.txt'
+META_FILE = 'store.json'
+
+
+def parse_frozenset(frozenset_str):
+    """Parse frozenset string from CSV back to Python set"""
+    if pd.isna(frozenset_str):
+        return frozenset()
+
+    match = re.search(r"frozenset\(\{(.+?)\}\)", str(frozenset_str))
+    if match:
+        items_str = match.group(1)
+        items = re.findall(r"'([^']+)'", items_str)
+        return frozenset(items)
+    return frozenset()
+
+
+def store_path(csv_path):
+    """Directory of the binary store that replaces a CSV export"""
+    root, ext = os.path.splitext(csv_path)
+    return root if ext == '.csv' else csv_path
+
+
+def metadata_path(csv_path):
+    """Run metadata (mining time, memory, ...) written next to a rules export"""
+    return store_path(csv_path) + '.meta.json'
+
+
+def run_metadata(algorithm, frequent_itemsets, rules, inputs, candidates=None, **run):
+    """
+    Run metadata of a rules export: the input (source, transactions, items),
+    candidates ({size: count}, None when the job does not count them) and
+    frequent itemsets per size, the itemset and rule counts, plus the fields
+    of the run (min_support, mining_seconds, peak_memory_mb, ...).
+    """
+    frequent = Counter(frequent_itemsets['itemsets'].map(len).tolist())
+    sizes = sorted(set(candidates or {}) | set(frequent))
+    return {
+        'algorithm': algorithm,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'input': inputs,
+        **run,
+        'levels': [{'size': size, 'candidates': candidates.get(size, 0) if candidates is not None else None,
+                    'frequent': frequent.get(size, 0)} for size in sizes],
+        'itemsets': len(frequent_itemsets),
+        'rules': len(rules),
+    }
+
+
+def save_metadata(csv_path, metadata):
+    with open(metadata_path(csv_path), 'w') as f:
+        json.dump(metadata, f, indent=1)
+
+
+def load_metadata(csv_path):
+    """Run metadata of a rules export, None if the job did not write any"""
+    try:
+        with open(metadata_path(csv_path)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _is_itemset_column(series):
+    return len(series) > 0 and all(isinstance(x, (set, frozenset)) for x in series)
+
+
+def save_frame(df, directory, paths=None):
+    """
+    Write a rules / frequent itemsets frame as a binary store.
+    Columns holding frozensets are offset-encoded, every other column must be numeric.
+    An existing path dictionary (list of paths) can be passed to share ids between stores.
+    """
+    os.makedirs(directory, exist_ok=True)
+    paths = list(paths) if paths is not None else []
+    path_ids = {p: i for i, p in enumerate(paths)}
+
+    itemset_columns, numeric_columns = [], []
+    for column in df.columns:
+        if _is_itemset_column(df[column]):
+            itemset_columns.append(column)
+            offsets = np.zeros(len(df) + 1, dtype=np.int64)
+            items = []
+            for row, itemset in enumerate(df[column]):
+                for page in sorted(itemset):
+                    if page not in path_ids:
+                        path_ids[page] = len(paths)
+                        paths.append(page)
+                    items.append(path_ids[page])
+                offsets[row + 1] = len(items)
+            np.save(os.path.join(directory, f'{column}.offsets.npy'), offsets)
+            np.save(os.path.join(directory, f'{column}.items.npy'), np.asarray(items, dtype=np.int32))
+        else:
+            numeric_columns.append(column)
+            np.save(os.path.join(directory, f'{column}.npy'), df[column].to_numpy(dtype=np.float64))
+
+    with open(os.path.join(directory, PATHS_FILE), 'w', encoding='utf-8') as f:
+        for page in paths:
+            f.write(page + '\n')
+
+    with open(os.path.join(directory, META_FILE), 'w') as f:
+        json.dump({
+            'version': STORE_VERSION,
+            'rows': len(df),
+            'columns': list(df.columns),
+            'itemset_columns': itemset_columns,
+            'numeric_columns': numeric_columns,
+        }, f, indent=1)
+
+    return paths
+
+
+class RuleStore:
+    """
+    Memory-mapped view of a binary store.
+    Itemset columns are exposed as (offsets, items) arrays of path ids,
+    numeric columns as float64 arrays.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, META_FILE)) as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Unsupported rule store version in {directory}: {meta.get('version')}")
+
+        self.rows = meta['rows']
+        self.columns = meta['columns']
+        self.itemset_columns = meta['itemset_columns']
+        self.numeric_columns = meta['numeric_columns']
+
+        with open(os.path.join(directory, PATHS_FILE), encoding='utf-8') as f:
+            self.paths = f.read().splitlines()
+
+    def _load(self, name):
+        return np.load(os.path.join(self.directory, name), mmap_mode='r')
+
+    def itemsets(self, column):
+        """(offsets, items) arrays of an itemset column"""
+        return self._load(f'{column}.offsets.npy'), self._load(f'{column}.items.npy')
+
+    def numeric(self, column):
+        return self._load(f'{column}.npy')
+
+    def __len__(self):
+        return self.rows
+
+    def to_frame(self):
+        """Frame with the same columns as the CSV export, itemsets as frozensets"""
+        paths = np.asarray(self.paths, dtype=object)
+        data = {}
+        for column in self.columns:
+            if column in self.itemset_columns:
+                offsets, items = self.itemsets(column)
+                pages = paths[np.asarray(items)]
+                data[column] = [frozenset(pages[a:b]) for a, b in zip(offsets[:-1], offsets[1:])]
+            else:
+                data[column] = self.numeric(column)
+        return pd.DataFrame(data, columns=self.columns)
+
+
+def load_frame(csv_path):
+    """
+    Load a rules / frequent itemsets export.
+    Uses the binary store next to the CSV when there is one, otherwise
+    reads the CSV and parses the frozenset columns.
+    """
+    directory = store_path(csv_path)
+    if os.path.exists(os.path.join(directory, META_FILE)):
+        return RuleStore(directory).to_frame()
+
+    df = pd.read_csv(csv_path)
+    for column in ('antecedents', 'consequents', 'itemsets'):
+        if column in df.columns:
+            df[column] = df[column].apply(parse_frozenset)
+    return df
+
+
+def main():
+    """
+    Convert CSV exports given on the command line into binary stores.
+    """
+    if len(sys.argv) < 2:
+        print("Usage: python -m usedAlgorithme.rule_store <export.csv> [...]")
+        return
+
+    for csv_path in sys.argv[1:]:
+        directory = store_path(csv_path)
+        df = load_frame(csv_path)
+        paths = save_frame(df, directory)
+        print(f"{csv_path} -> {directory}/ ({len(df):,} rows, {len(paths):,} paths)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+rules.py
+Association rule generation from frequent itemsets, in place of
+mlxtend's association_rules:
+- Antecedent / consequent supports are looked up in a hash index of the itemsets
+- With metric="confidence", consequents are grown level-wise and only from
+  consequents that passed: moving items from the antecedent to the consequent
+  can only lower confidence, so failing branches are never enumerated
+- Only the requested metric columns are computed, vectorized over all rules
+- Itemsets can be spread over a process pool
+
+The output has the same columns (and row order) as mlxtend's association_rules,
+i.e. the layout of the *_rules.csv files.
+"""
+
+from itertools import combinations
+from multiprocessing import Pool
+
+import numpy as np
+import pandas as pd
+
+
+ALL_METRICS = [
+    'antecedent support',
+    'consequent support',
+    'support',
+    'confidence',
+    'lift',
+    'representativity',
+    'leverage',
+    'conviction',
+    'zhangs_metric',
+    'jaccard',
+    'certainty',
+    'kulczynski',
+]
+
+# Itemsets handed to a worker at a time
+CHUNK_SIZE = 2000
+
+
+def compute_metric(name, sAC, sA, sC):
+    """One metric column from the rule, antecedent and consequent supports (arrays)."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if name == 'antecedent support':
+            return sA
+        if name == 'consequent support':
+            return sC
+        if name == 'support':
+            return sAC
+        if name == 'confidence':
+            return sAC / sA
+        if name == 'lift':
+            return sAC / sA / sC
+        if name == 'representativity':
+            return np.ones_like(sAC)
+        if name == 'leverage':
+            return sAC - sA * sC
+        if name == 'conviction':
+            confidence = sAC / sA
+            conviction = np.full(confidence.shape, np.inf)
+            below = confidence < 1.0
+            conviction[below] = (1.0 - sC[below]) / (1.0 - confidence[below])
+            return conviction
+        if name == 'zhangs_metric':
+            denominator = np.maximum(sAC * (1 - sA), sA * (sC - sAC))
+            return np.where(denominator == 0, 0, (sAC - sA * sC) / denominator)
+        if name == 'jaccard':
+            return sAC / (sA + sC - sAC)
+        if name == 'certainty':
+            return np.where(1 - sC == 0, 0, (sAC / sA - sC) / (1 - sC))
+        if name == 'kulczynski':
+            return (sAC / sA + sAC / sC) / 2
+    raise ValueError(f"Unknown metric '{name}', expected one of {ALL_METRICS}")
+
+
+def _next_level(consequents):
+    """
+    Apriori candidate generation on consequents (sorted position tuples):
+    join pairs sharing all but their last position, keep candidates whose
+    subsets all passed.
+    """
+    passed = set(consequents)
+    candidates = []
+    for a, b in combinations(consequents, 2):
+        if a[:-1] == b[:-1]:
+            candidate = a + b[-1:] if a[-1] < b[-1] else b + a[-1:]
+            if all(candidate[:k] + candidate[k + 1:] in passed for k in range(len(candidate))):
+                candidates.append(candidate)
+    return sorted(candidates)
+
+
+def itemset_rules(items, sAC, index, metric, min_threshold):
+    """
+    Rules of one itemset (tuple of items) as lists of antecedent positions,
+    antecedent supports and consequent supports, in mlxtend's order: larger
+    antecedents first, antecedents in combination order.
+    With a metric other than confidence every split is returned, the threshold
+    is applied afterwards on all rules at once.
+    """
+    n = len(items)
+    itemset = frozenset(items)
+
+    if metric == 'confidence':
+        # Level-wise over consequents, as positions in items
+        found = []
+        level = [(j,) for j in range(n)]
+        while level and len(level[0]) < n:
+            kept = []
+            for positions in level:
+                consequent = frozenset(items[j] for j in positions)
+                sA = index[itemset.difference(consequent)]
+                if sAC / sA >= min_threshold:
+                    kept.append(positions)
+                    found.append((tuple(j for j in range(n) if j not in positions), sA, index[consequent]))
+            level = _next_level(kept)
+        found.sort(key=lambda rule: (-len(rule[0]), rule[0]))
+        return [rule[0] for rule in found], [rule[1] for rule in found], [rule[2] for rule in found]
+
+    positions, antecedent_supports, consequent_supports = [], [], []
+    for size in range(n - 1, 0, -1):
+        positions.extend(combinations(range(n), size))
+        for antecedent in combinations(items, size):
+            antecedent = frozenset(antecedent)
+            antecedent_supports.append(index[antecedent])
+            consequent_supports.append(index[itemset.difference(antecedent)])
+    return positions, antecedent_supports, consequent_supports
+
+
+def _chunk_rules(chunk, index, metric, min_threshold):
+    """
+    Rules of a chunk of (items, support): for each rule, the itemset's number
+    in the chunk and the antecedent positions, plus a (rules x 3) array of
+    supports (sAC, sA, sC).
+    """
+    owners, rules, sAC, sA, sC = [], [], [], [], []
+    for k, (items, support) in enumerate(chunk):
+        positions, antecedent_supports, consequent_supports = itemset_rules(
+            items, support, index, metric, min_threshold)
+        owners.extend([k] * len(positions))
+        sAC.extend([support] * len(positions))
+        rules.extend(positions)
+        sA.extend(antecedent_supports)
+        sC.extend(consequent_supports)
+    supports = np.array([sAC, sA, sC], dtype=float).T.reshape(-1, 3)
+    owners = np.array(owners, dtype=np.int64)
+
+    if metric != 'confidence':
+        keep = compute_metric(metric, supports[:, 0], supports[:, 1], supports[:, 2]) >= min_threshold
+        rules = [rules[i] for i in np.flatnonzero(keep)]
+        owners, supports = owners[keep], supports[keep]
+    return owners, rules, supports
+
+
+# Itemset index and settings of the worker processes
+_worker = {}
+
+
+def _init_worker(index, metric, min_threshold):
+    _worker['args'] = (index, metric, min_threshold)
+
+
+def _run_chunk(chunk):
+    return _chunk_rules(chunk, *_worker['args'])
+
+
+def association_rules(frequent_itemsets, metric='confidence', min_threshold=0.8, metrics=None, workers=1):
+    """
+    Association rules of a support / itemsets frame.
+    metric, min_threshold: rules kept when metric >= min_threshold.
+    metrics: columns to compute (default: all of ALL_METRICS).
+    workers: number of processes the itemsets are spread over.
+    """
+    metrics = ALL_METRICS if metrics is None else [m for m in ALL_METRICS if m in metrics]
+    columns = ['antecedents', 'consequents'] + metrics
+    if metric not in ALL_METRICS:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {ALL_METRICS}")
+
+    # Itemsets rebuilt item by item like mlxtend does, so they iterate (and
+    # rules come out) in the same order
+    index = {frozenset(int(item) if isinstance(item, np.generic) else item for item in itemset): support
+             for itemset, support in zip(frequent_itemsets['itemsets'], frequent_itemsets['support'])}
+    itemsets = [itemset for itemset in index if len(itemset) > 1]
+    # Items are passed as tuples: frozensets may iterate in another order once pickled
+    candidates = [(tuple(itemset), index[itemset]) for itemset in itemsets]
+    chunks = [candidates[i:i + CHUNK_SIZE] for i in range(0, len(candidates), CHUNK_SIZE)]
+
+    if workers > 1 and len(chunks) > 1:
+        with Pool(workers, initializer=_init_worker, initargs=(index, metric, min_threshold)) as pool:
+            results = pool.map(_run_chunk, chunks)
+    else:
+        results = [_chunk_rules(chunk, index, metric, min_threshold) for chunk in chunks]
+
+    antecedents, consequents = [], []
+    for start, (owners, rules, _) in zip(range(0, len(itemsets), CHUNK_SIZE), results):
+        for k, positions in zip(owners.tolist(), rules):
+            itemset = itemsets[start + k]
+            antecedent = frozenset(item for j, item in enumerate(itemset) if j in positions)
+            antecedents.append(antecedent)
+            consequents.append(itemset.difference(antecedent))
+    if not antecedents:
+        return pd.DataFrame(columns=columns)
+
+    supports = np.concatenate([result[2] for result in results])
+    sAC, sA, sC = supports[:, 0], supports[:, 1], supports[:, 2]
+
+    rules = pd.DataFrame({'antecedents': antecedents, 'consequents': consequents})
+    for name in metrics:
+        rules[name] = compute_metric(name, sAC, sA, sC)
+    return rules[columns]
@@ -0,0 +1,171 @@
+"""
+sampling.py
+Approximate frequent itemsets from a random sample, for quick exploration:
+- The sample size comes from the requested accuracy: with
+  n >= ln(2 / delta) / (2 * epsilon^2) transactions (Hoeffding), the support
+  of an itemset in the sample is within epsilon of its true support with
+  probability at least 1 - delta (ln(2 * m / delta) to hold for m itemsets at once)
+- The sample is a reservoir sample (Algorithm L), drawn in one pass over
+  cleaned_data.csv or any other sessions, with memory for the sample only
+- The sample is mined with ECLAT at min_support - epsilon, so an itemset
+  that is frequent in the full data is missed with probability at most delta
+- Every itemset gets a confidence interval [support_low, support_high]
+  around its sample support
+- With verify=True, only the itemsets found in the sample are counted on the
+  full data (bitsets of their paths, as in incremental.py): supports become
+  exact and false positives are dropped
+
+Apriori, FP-Growth and ECLAT find the same itemsets, so the sampled itemsets
+stand in for any of them (e.g. association_rules(frame) for rules).
+
+Usage (from the project root):
+    python -m usedAlgorithme.sampling --epsilon 0.005 --delta 0.05
+    python -m usedAlgorithme.sampling Data/extractedAndcleanedData/cleaned_data.csv --verify
+"""
+
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from cleanningData.transactions import Transactions
+from usedAlgorithme.eclat import eclat
+from usedAlgorithme.incremental import ItemsetCounter
+from usedAlgorithme.mining import CLEANED_DATA, from_lists, load_transactions
+
+
+def sample_size(epsilon, delta, n_itemsets=1):
+    """
+    Transactions needed for sample supports within epsilon of the true ones
+    with probability 1 - delta, for n_itemsets itemsets at once (union bound).
+    """
+    if not 0 < epsilon < 1 or not 0 < delta < 1:
+        raise ValueError("epsilon and delta must be between 0 and 1")
+    return math.ceil(math.log(2 * n_itemsets / delta) / (2 * epsilon ** 2))
+
+
+def interval_width(n, delta):
+    """Half-width of the Hoeffding confidence interval of a support measured on n transactions"""
+    return math.sqrt(math.log(2 / delta) / (2 * n))
+
+
+def reservoir_sample(items, size, seed=None):
+    """
+    Uniform sample of size elements of an iterable, in one pass (Algorithm L:
+    the number of elements skipped between replacements is drawn directly).
+    Returns (sample, number of elements seen).
+    """
+    rng = random.Random(seed)
+    iterator = iter(items)
+    sample = []
+    seen = 0
+    for item in iterator:
+        sample.append(item)
+        seen += 1
+        if seen == size:
+            break
+    if seen < size or size == 0:
+        return sample, seen
+
+    w = math.exp(math.log(rng.random()) / size)
+    while True:
+        skip = math.floor(math.log(rng.random()) / math.log(1 - w))
+        for item in iterator:
+            seen += 1
+            if skip == 0:
+                break
+            skip -= 1
+        else:
+            return sample, seen
+        sample[rng.randrange(size)] = item
+        w *= math.exp(math.log(rng.random()) / size)
+
+
+def iter_sessions(data):
+    """Sessions (lists of paths) of a cleaned_data.csv style file, Transactions or lists"""
+    if isinstance(data, str):
+        with open(data, 'r', encoding='utf-8') as f:
+            for line in f:
+                yield [p for p in line.strip().split(',') if p != '']
+    elif isinstance(data, Transactions):
+        paths = np.asarray(data.paths, dtype=object)
+        for i in range(len(data)):
+            yield list(paths[data[i]])
+    else:
+        yield from data
+
+
+def approximate_itemsets(data=CLEANED_DATA, min_support=0.01, epsilon=0.005, delta=0.05,
+                         verify=False, seed=None, max_len=None):
+    """
+    Frequent itemsets mined on a reservoir sample.
+    data: cleaned_data.csv style file, Transactions or lists of paths.
+    Returns (frame, info): frame has the support / itemsets columns plus
+    support_low / support_high, info the sample and full data sizes.
+    """
+    size = sample_size(epsilon, delta)
+    started = time.perf_counter()
+    sample, n_transactions = reservoir_sample(iter_sessions(data), size, seed)
+    exact = len(sample) == n_transactions
+    # All transactions fit in the sample: supports are exact already
+    width = 0.0 if exact else interval_width(len(sample), delta)
+
+    found = eclat(sample, max(min_support - width, 0.0), max_len=max_len)
+    info = {
+        'sample_size': len(sample),
+        'n_transactions': n_transactions,
+        'candidates': len(found),
+        'sample_seconds': time.perf_counter() - started,
+    }
+
+    if verify and not exact:
+        started = time.perf_counter()
+        if isinstance(data, str):
+            full = load_transactions(data)
+        elif isinstance(data, Transactions):
+            full = data
+        else:
+            full = from_lists(data)
+        itemsets = list(found['itemsets'])
+        counter = ItemsetCounter(full, paths=set().union(*itemsets) if itemsets else set())
+        found['support'] = counter.count([tuple(itemset) for itemset in itemsets]) / counter.n_transactions
+        found = found[found['support'] >= min_support]
+        found = found.sort_values('support', ascending=False, kind='stable').reset_index(drop=True)
+        info['verify_seconds'] = time.perf_counter() - started
+        width = 0.0
+
+    found['support_low'] = (found['support'] - width).clip(lower=0.0)
+    found['support_high'] = (found['support'] + width).clip(upper=1.0)
+    return found, info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Approximate frequent itemsets from a sample of the sessions.")
+    parser.add_argument('input', nargs='?', default=CLEANED_DATA, help="cleaned_data.csv style file")
+    parser.add_argument('--min-support', type=float, default=0.01)
+    parser.add_argument('--epsilon', type=float, default=0.005, help="Support error")
+    parser.add_argument('--delta', type=float, default=0.05, help="Probability of exceeding the error")
+    parser.add_argument('--verify', action='store_true', help="Recount the sampled itemsets on the full data")
+    parser.add_argument('--max-len', type=int, default=None, help="Largest itemset size")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--output', default=None, help="Write the itemsets to this CSV")
+    args = parser.parse_args()
+
+    frequent_itemsets, info = approximate_itemsets(args.input, args.min_support, args.epsilon, args.delta,
+                                                   args.verify, args.seed, args.max_len)
+    print(f"Sampled {info['sample_size']} of {info['n_transactions']} transactions "
+          f"({info['sample_seconds']:.2f}s)")
+    if 'verify_seconds' in info:
+        print(f"Verified {info['candidates']} candidates on the full data ({info['verify_seconds']:.2f}s)")
+    print(f"  - Frequent itemsets: {len(frequent_itemsets)}")
+    with pd.option_context('display.max_colwidth', 80, 'display.width', 160):
+        print(frequent_itemsets.head(20).to_string(index=False))
+    if args.output:
+        frequent_itemsets.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""
+sequences.py
+Sequence-aware models of the ordered cleaned sessions (the notebooks mine
+list(set(t)) and lose the page order):
+- Sessions are read in visit order (the transactions/ arrays or
+  cleaned_data.csv), without the noise paths the FP-Growth and ECLAT
+  notebooks leave out
+- PrefixSpan: frequent sequential patterns (pages in order, possibly with
+  other pages in between), mined on pseudo-projections of the session
+  arrays; written to Data/sequences/sequential_patterns.csv
+- k-th order Markov model: for every context of the last 1..k pages seen at
+  least min_count times, the pages that followed it, by decreasing count.
+  Contexts are encoded as integers (base: number of paths) and stored as
+  sorted arrays, so a lookup is a binary search per order
+  (prediction/sequence_index.py); written to Data/sequences/markov/
+
+Usage (from the project root):
+    python -m usedAlgorithme.sequences
+    python -m usedAlgorithme.sequences Data/extractedAndcleanedData/cleaned_data.csv --order 3 --min-count 5 --min-support 0.01
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from cleanningData.transactions import Transactions, write_paths
+from usedAlgorithme.mining import CLEANED_DATA, NOISE, load_transactions
+
+
+MODEL_DIR = 'Data/sequences/markov'
+PATTERNS = 'Data/sequences/sequential_patterns.csv'
+MODEL_VERSION = 1
+META_FILE = 'store.json'
+
+
+def ordered_sessions(transactions, dropped=NOISE):
+    """
+    Sessions in visit order without the dropped paths, consecutive repeats
+    (left once the dropped paths are gone) collapsed.
+    """
+    dropped = set(dropped)
+    keep_path = np.asarray([path not in dropped for path in transactions.paths], dtype=bool)
+    items = np.asarray(transactions.items, dtype=np.int64)
+    rows = transactions.session_ids()
+    keep = keep_path[items] if len(items) else np.zeros(0, dtype=bool)
+    rows, items = rows[keep], items[keep]
+
+    repeat = np.zeros(len(items), dtype=bool)
+    repeat[1:] = (rows[1:] == rows[:-1]) & (items[1:] == items[:-1])
+    rows, items = rows[~repeat], items[~repeat]
+
+    offsets = np.zeros(len(transactions) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(transactions)), out=offsets[1:])
+    return Transactions(offsets, items, transactions.paths)
+
+
+def _suffixes(transactions, sequences, starts):
+    """Entries of the suffixes items[start:end] of projected sequences: (projection row, position)"""
+    ends = np.asarray(transactions.offsets)[sequences + 1]
+    lengths = np.maximum(ends - starts, 0)
+    total = int(lengths.sum())
+    rows = np.repeat(np.arange(len(sequences)), lengths)
+    positions = np.repeat(starts, lengths) + (np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+    return rows, positions
+
+
+def prefixspan(transactions, min_support=0.01, max_len=None):
+    """
+    Frequent sequential patterns of ordered sessions (Pei et al., PrefixSpan).
+    A projected database is a pair of arrays (session, start of its suffix);
+    the pages of a projection are counted once per session, and each frequent
+    page extends the prefix with the suffixes after its first occurrence.
+    Returns a frame with 'support' (fraction of sessions) and 'sequence'
+    (tuple of paths), like the frequent itemsets frames.
+    """
+    items = np.asarray(transactions.items, dtype=np.int64)
+    n_sessions, n_items = len(transactions), max(transactions.n_items, 1)
+    min_count = max(int(np.ceil(min_support * n_sessions)), 1)
+    patterns = []
+
+    # Depth-first over prefixes: (prefix, sessions, suffix starts)
+    stack = [((), np.arange(n_sessions), np.asarray(transactions.offsets[:-1], dtype=np.int64))]
+    while stack:
+        prefix, sequences, starts = stack.pop()
+        if max_len is not None and len(prefix) >= max_len:
+            continue
+        rows, positions = _suffixes(transactions, sequences, starts)
+        if len(rows) == 0:
+            continue
+        # First occurrence of every page in every projected session
+        keys, first = np.unique(rows * n_items + items[positions], return_index=True)
+        pages = keys % n_items
+        counts = np.bincount(pages, minlength=n_items)
+        frequent = np.flatnonzero(counts >= min_count)
+        if len(frequent) == 0:
+            continue
+
+        order = np.argsort(pages, kind='stable')
+        bounds = np.searchsorted(pages[order], frequent)
+        for page, start, count in zip(frequent, bounds, counts[frequent]):
+            group = order[start:start + count]
+            pattern = prefix + (int(page),)
+            patterns.append((count / n_sessions, pattern))
+            stack.append((pattern, sequences[keys[group] // n_items], positions[first[group]] + 1))
+
+    patterns.sort(key=lambda p: (len(p[1]), -p[0], p[1]))
+    return pd.DataFrame({
+        'support': [support for support, _ in patterns],
+        'sequence': [tuple(transactions.paths[i] for i in pattern) for _, pattern in patterns],
+    }, columns=['support', 'sequence'])
+
+
+def encode_context(path_ids, n_paths):
+    """Integer code of a context (path ids, oldest first)"""
+    key = 0
+    for path_id in path_ids:
+        key = key * n_paths + int(path_id)
+    return key
+
+
+def transition_tables(transactions, order=3, min_count=2):
+    """
+    Next-page counts of every context of 1..order pages seen at least
+    min_count times. Returns {context length: (keys, ptr, next pages, counts)}:
+    keys are the sorted context codes (see encode_context), the next pages
+    of keys[i] are next[ptr[i]:ptr[i + 1]], by decreasing count.
+    """
+    n_paths = max(transactions.n_items, 1)
+    if n_paths ** order >= 2 ** 63:
+        raise ValueError(f"{n_paths} paths do not fit contexts of order {order} in 64-bit codes")
+    items = np.asarray(transactions.items, dtype=np.int64)
+    rows = transactions.session_ids()
+    offsets = np.asarray(transactions.offsets, dtype=np.int64)
+
+    tables = {}
+    for length in range(1, order + 1):
+        # Positions preceded by `length` pages of the same session
+        target = np.arange(len(items))
+        target = target[target - length >= offsets[rows]] if len(items) else target
+        keys = np.zeros(len(target), dtype=np.int64)
+        for back in range(length, 0, -1):
+            keys = keys * n_paths + items[target - back]
+        following = items[target]
+
+        # Count (context, next page) pairs
+        pair_order = np.lexsort((following, keys))
+        keys, following = keys[pair_order], following[pair_order]
+        new_pair = np.ones(len(keys), dtype=bool)
+        new_pair[1:] = (keys[1:] != keys[:-1]) | (following[1:] != following[:-1])
+        starts = np.flatnonzero(new_pair)
+        counts = np.diff(np.append(starts, len(keys)))
+        keys, following = keys[starts], following[starts]
+
+        # Contexts seen often enough
+        new_context = np.ones(len(keys), dtype=bool)
+        new_context[1:] = keys[1:] != keys[:-1]
+        context_of = np.cumsum(new_context) - 1
+        totals = np.bincount(context_of, weights=counts).astype(np.int64)
+        keep = totals[context_of] >= min_count
+        keys, following, counts = keys[keep], following[keep], counts[keep]
+
+        # Next pages by decreasing count (then page id) within each context
+        ranked = np.lexsort((following, -counts, keys))
+        keys, following, counts = keys[ranked], following[ranked], counts[ranked]
+        new_context = np.ones(len(keys), dtype=bool)
+        new_context[1:] = keys[1:] != keys[:-1]
+        ptr = np.append(np.flatnonzero(new_context), len(keys)).astype(np.int64)
+        tables[length] = (keys[new_context], ptr, following.astype(np.int32), counts.astype(np.int32))
+    return tables
+
+
+def page_counts(transactions):
+    """Visits of every path (for the lift of a prediction)"""
+    return np.bincount(np.asarray(transactions.items, dtype=np.int64), minlength=transactions.n_items)
+
+
+def save_model(directory, tables, paths, counts, metadata=None):
+    """Write the transition tables as one .npy file per array, like the rule stores"""
+    os.makedirs(directory, exist_ok=True)
+    write_paths(directory, paths)
+    np.save(os.path.join(directory, 'page_counts.npy'), np.asarray(counts, dtype=np.int64))
+    for length, (keys, ptr, following, transitions) in tables.items():
+        np.save(os.path.join(directory, f'order{length}.keys.npy'), keys)
+        np.save(os.path.join(directory, f'order{length}.ptr.npy'), ptr)
+        np.save(os.path.join(directory, f'order{length}.next.npy'), following)
+        np.save(os.path.join(directory, f'order{length}.counts.npy'), transitions)
+    with open(os.path.join(directory, META_FILE), 'w') as f:
+        json.dump({'version': MODEL_VERSION, 'order': max(tables, default=0),
+                   'contexts': {length: len(table[0]) for length, table in tables.items()},
+                   **(metadata or {})}, f, indent=1)
+
+
+def load_tables(directory):
+    """(tables, paths, page counts, metadata) of a saved model, arrays memory-mapped"""
+    with open(os.path.join(directory, META_FILE)) as f:
+        metadata = json.load(f)
+    if metadata.get('version') != MODEL_VERSION:
+        raise ValueError(f"Unsupported sequence model version in {directory}: {metadata.get('version')}")
+    with open(os.path.join(directory, 'paths.txt'), encoding='utf-8') as f:
+        paths = f.read().splitlines()
+
+    def load(name):
+        return np.load(os.path.join(directory, name), mmap_mode='r')
+
+    tables = {length: tuple(load(f'order{length}.{part}.npy') for part in ('keys', 'ptr', 'next', 'counts'))
+              for length in range(1, metadata['order'] + 1)}
+    return tables, paths, load('page_counts.npy'), metadata
+
+
+def build_model(transactions, order=3, min_count=2, dropped=NOISE):
+    """
+    Transition tables, page counts and metadata of ordered sessions (see
+    ordered_sessions; dropped: the paths it left out, recorded so that
+    predictions leave them out of the context too)
+    """
+    tables = transition_tables(transactions, order, min_count)
+    metadata = {'sessions': len(transactions), 'min_count': min_count, 'dropped': sorted(dropped),
+                'transitions': int(np.maximum(np.diff(transactions.offsets) - 1, 0).sum())}
+    return tables, page_counts(transactions), metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mine sequential patterns and a k-th order Markov model of the ordered sessions.")
+    parser.add_argument('input', nargs='?', default=CLEANED_DATA, help="Cleaned sessions file")
+    parser.add_argument('--order', type=int, default=3, help="Longest context (pages)")
+    parser.add_argument('--min-count', type=int, default=2, help="Occurrences for a context to be kept")
+    parser.add_argument('--min-support', type=float, default=0.01, help="PrefixSpan minimum support")
+    parser.add_argument('--max-len', type=int, default=None, help="Longest sequential pattern")
+    parser.add_argument('--output', default=MODEL_DIR, help="Model directory")
+    parser.add_argument('--patterns', default=PATTERNS, help="Sequential patterns CSV")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    sessions = ordered_sessions(load_transactions(args.input))
+    loaded = time.perf_counter()
+    tables, counts, metadata = build_model(sessions, args.order, args.min_count)
+    save_model(args.output, tables, sessions.paths, counts, {**metadata, 'source': args.input})
+    built = time.perf_counter()
+    print(f"Loaded {len(sessions):,} sessions in {loaded - started:.2f}s")
+    contexts = ', '.join(f"{len(table[0]):,} of {length}" for length, table in tables.items())
+    print(f"Markov model (contexts: {contexts}) in {built - loaded:.2f}s -> {args.output}/")
+
+    patterns = prefixspan(sessions, args.min_support, args.max_len)
+    directory = os.path.dirname(args.patterns)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    exported = patterns.assign(sequence=patterns['sequence'].map(' > '.join))
+    exported.to_csv(args.patterns, index=False)
+    print(f"{len(patterns):,} sequential patterns in {time.perf_counter() - built:.2f}s -> {args.patterns}")
+
+
+if __name__ == "__main__":
+    main()
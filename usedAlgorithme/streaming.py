@@ -0,0 +1,200 @@
+"""
+streaming.py
+Sliding-window streaming miner for near-real-time rules:
+- Consumes cleaned sessions one at a time (from a file, a pipe or the raw
+  extracted sessions cleaned on the fly with clean_extracted_data)
+- The window holds the last `window` sessions, split into panes of `pane` sessions
+- Each closed pane is mined with ECLAT at the error rate: itemsets below it
+  are dropped, as in lossy counting, so an itemset's window count is
+  underestimated by at most error * window
+- Window counts are the sum of the pane counts; the oldest pane is subtracted
+  when it leaves the window
+- Memory is bounded by the pane buffer plus one table of error-frequent
+  itemsets (at most max_len items) per pane
+
+Every `snapshot_every` panes the itemsets with an estimated support of at least
+min_support - error are turned into rules and written as a CSV export plus
+binary store, the files load_precomputed_rules reads, with the run metadata
+of the snapshot (the window, the time taken by its last pane).
+
+Usage (from the project root):
+    tail -f Data/extractedAndcleanedData/cleaned_data.csv | python -m usedAlgorithme.streaming
+    python -m usedAlgorithme.streaming Data/extractedAndcleanedData/extracted_logs.csv --clean
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+from collections import Counter, deque
+
+import pandas as pd
+
+from cleanningData.clean_extracted_data import clean_session, read_sessions
+from usedAlgorithme.eclat import eclat
+from usedAlgorithme.rule_store import run_metadata, save_frame, save_metadata, store_path
+from usedAlgorithme.rules import association_rules
+
+
+STREAMING_RULES = 'Data/streaming/streaming_rules.csv'
+
+
+class StreamingMiner:
+    """
+    Approximate frequent itemsets over the last `window` sessions.
+    error defaults to min_support / 5.
+    """
+
+    def __init__(self, window=10_000, pane=1_000, min_support=0.01, error=None, max_len=3):
+        if window % pane != 0:
+            raise ValueError("window must be a multiple of pane")
+        self.window = window
+        self.pane = pane
+        self.min_support = min_support
+        self.error = error if error is not None else min_support / 5
+        self.max_len = max_len
+
+        self.current = []
+        self.panes = deque()
+        self.counts = Counter()
+        self.n_sessions = 0
+        self.n_panes = 0
+
+    def add(self, session):
+        """Add one session (list of paths). Returns True when it closed a pane."""
+        self.current.append(session)
+        if len(self.current) >= self.pane:
+            self.close_pane()
+            return True
+        return False
+
+    def close_pane(self):
+        if not self.current:
+            return
+        n = len(self.current)
+        found = eclat(self.current, self.error, max_len=self.max_len)
+        counts = {itemset: int(round(support * n)) for itemset, support in zip(found['itemsets'], found['support'])}
+        self.current = []
+
+        self.panes.append((n, counts))
+        self.counts.update(counts)
+        self.n_sessions += n
+        self.n_panes += 1
+
+        while self.n_sessions > self.window:
+            old_n, old_counts = self.panes.popleft()
+            self.counts.subtract(old_counts)
+            for itemset in old_counts:
+                if self.counts[itemset] <= 0:
+                    del self.counts[itemset]
+            self.n_sessions -= old_n
+
+    def frequent_itemsets(self):
+        """
+        support / itemsets frame of the window, by support.
+        Estimates never exceed the true support and the set is downward
+        closed (a subset is error-frequent in every pane its superset is).
+        """
+        if self.n_sessions == 0:
+            return pd.DataFrame({'support': [], 'itemsets': []})
+        min_count = (self.min_support - self.error) * self.n_sessions
+        found = [(itemset, count) for itemset, count in self.counts.items() if count >= min_count]
+        frame = pd.DataFrame({
+            'support': [count / self.n_sessions for _, count in found],
+            'itemsets': [itemset for itemset, _ in found],
+        })
+        return frame.sort_values('support', ascending=False, kind='stable').reset_index(drop=True)
+
+    def rules(self, min_confidence=0.5):
+        """(frequent itemsets, rules) of the window"""
+        frequent_itemsets = self.frequent_itemsets()
+        rules = association_rules(frequent_itemsets, metric="confidence", min_threshold=min_confidence)
+        return frequent_itemsets, rules
+
+
+def write_snapshot(rules, output=STREAMING_RULES, metadata=None):
+    """
+    Write a rules snapshot (CSV and binary store), and its run metadata when
+    given. Both are written next to their target and swapped in, so a reader
+    never sees a half-written snapshot.
+    """
+    directory = os.path.dirname(output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_csv = output + '.tmp'
+    rules.to_csv(tmp_csv, index=False)
+    os.replace(tmp_csv, output)
+
+    store = store_path(output)
+    tmp_store, old_store = store + '.tmp', store + '.old'
+    shutil.rmtree(tmp_store, ignore_errors=True)
+    save_frame(rules, tmp_store)
+    if os.path.exists(store):
+        shutil.rmtree(old_store, ignore_errors=True)
+        os.rename(store, old_store)
+    os.rename(tmp_store, store)
+    shutil.rmtree(old_store, ignore_errors=True)
+    if metadata is not None:
+        save_metadata(output, metadata)
+
+
+def stream_sessions(infile, clean=False):
+    """
+    Sessions of cleaned_data.csv style lines, or of extracted_logs.csv lines
+    cleaned the way clean_extracted_data does with clean=True.
+    """
+    for paths in read_sessions(infile):
+        if clean:
+            paths = clean_session(paths)
+        if len(paths) >= 2:
+            yield paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mine rules over a sliding window of a session stream.")
+    parser.add_argument('input', nargs='?', default='-', help="Sessions file ('-' for stdin)")
+    parser.add_argument('--clean', action='store_true', help="Input is raw extracted sessions, clean them first")
+    parser.add_argument('--window', type=int, default=10_000, help="Sessions in the window")
+    parser.add_argument('--pane', type=int, default=1_000, help="Sessions per pane (window step)")
+    parser.add_argument('--min-support', type=float, default=0.01)
+    parser.add_argument('--error', type=float, default=None, help="Support error (default: min-support / 5)")
+    parser.add_argument('--max-len', type=int, default=3, help="Largest itemset size")
+    parser.add_argument('--min-confidence', type=float, default=0.5)
+    parser.add_argument('--snapshot-every', type=int, default=1, help="Panes between rule snapshots")
+    parser.add_argument('--output', default=STREAMING_RULES, help="Rules CSV (a binary store is written next to it)")
+    args = parser.parse_args()
+
+    miner = StreamingMiner(args.window, args.pane, args.min_support, args.error, args.max_len)
+    infile = sys.stdin if args.input == '-' else open(args.input, 'r')
+    try:
+        for session in stream_sessions(infile, args.clean):
+            started = time.perf_counter()
+            if miner.add(session) and miner.n_panes % args.snapshot_every == 0:
+                mined = time.perf_counter()
+                frequent_itemsets, rules = miner.rules(args.min_confidence)
+                inputs = {'source': args.input, 'transactions': miner.n_sessions,
+                          'items': sum(len(itemset) == 1 for itemset in miner.counts)}
+                metadata = run_metadata(
+                    'streaming', frequent_itemsets, rules, inputs,
+                    min_support=args.min_support,
+                    min_confidence=args.min_confidence,
+                    mining_seconds=round(mined - started, 3),
+                    rules_seconds=round(time.perf_counter() - mined, 3),
+                    executor='streaming',
+                    peak_memory_mb=None,
+                    non_redundant=False,
+                    window=args.window,
+                    error=miner.error,
+                )
+                write_snapshot(rules, args.output, metadata)
+                print(f"Snapshot after {miner.n_panes * args.pane} sessions: "
+                      f"{len(frequent_itemsets)} itemsets, {len(rules)} rules", flush=True)
+    finally:
+        if infile is not sys.stdin:
+            infile.close()
+
+
+if __name__ == "__main__":
+    main()
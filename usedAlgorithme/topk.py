@@ -0,0 +1,127 @@
+"""
+topk.py
+Top-k association rules by confidence or lift (TopKRules-style), so that the
+number of rules no longer depends on min_support:
+- Returns the k rules with the highest confidence (or lift), ties going to
+  the more supported rule
+- The metric threshold starts at min_threshold and rises to the metric of
+  the k-th best rule as rules are found; with confidence it prunes the
+  consequents of every later itemset (rules.itemset_rules grows them
+  level-wise and drops those below it)
+- Itemsets are searched with the ECLAT bitset code (eclat.extend), items in
+  ascending support order and visited from the last one, so the most frequent
+  itemsets come first and every subset of an itemset has been counted before
+  it (antecedent supports are known)
+
+Confidence and lift have no anti-monotone bound over itemsets, so itemsets
+are pruned by a fixed support floor (min_support): it bounds the search time
+and how rare a rule can be, not how many rules come out.
+"""
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from usedAlgorithme.eclat import TIDSET, bitsets, extend, frequent_items, vertical_matrix
+from usedAlgorithme.rules import ALL_METRICS, compute_metric, itemset_rules
+
+
+RANKED_METRICS = ['confidence', 'lift']
+
+
+class TopKRules:
+    """
+    Best k rules found so far, and the metric a rule needs to enter them.
+    min_count is the fixed support floor of the searched itemsets.
+    """
+
+    def __init__(self, k, metric, min_threshold, min_count):
+        self.k = k
+        self.metric = metric
+        self.min_threshold = min_threshold
+        self.min_count = min_count
+        # (metric, support count, -arrival, rule): the worst rule on top, earlier rules win ties
+        self.heap = []
+        self.pushed = 0
+
+    def add(self, count, scores, rules):
+        for score, rule in zip(scores, rules):
+            if score < self.min_threshold:
+                continue
+            entry = (score, count, -self.pushed, rule)
+            self.pushed += 1
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, entry)
+            elif entry[:3] > self.heap[0][:3]:
+                heapq.heapreplace(self.heap, entry)
+        if len(self.heap) >= self.k:
+            self.min_threshold = max(self.min_threshold, self.heap[0][0])
+
+
+def _search(items, words, supports, mode, prefix, top, index, n_transactions, max_len):
+    """
+    Depth-first search of one equivalence class, members visited from the last one.
+    index maps every itemset visited so far (frozenset of item ids) to its support.
+    """
+    for i in range(len(items) - 1, -1, -1):
+        if supports[i] < top.min_count:
+            continue
+        itemset = prefix + (items[i],)
+        sAC = supports[i] / n_transactions
+        index[frozenset(itemset)] = sAC
+
+        if len(itemset) > 1:
+            positions, sA, sC = itemset_rules(itemset, sAC, index, top.metric, top.min_threshold)
+            if positions:
+                sA, sC = np.asarray(sA), np.asarray(sC)
+                scores = compute_metric(top.metric, np.full(len(sA), sAC), sA, sC)
+                top.add(int(supports[i]), scores.tolist(),
+                        [(itemset, p, a, c) for p, a, c in zip(positions, sA.tolist(), sC.tolist())])
+
+        if max_len is not None and len(itemset) >= max_len:
+            continue
+        frequent, child_supports, child_words, child_mode = extend(words, supports, mode, i, top.min_count)
+        if len(frequent) > 0:
+            child_items = [items[i + 1 + j] for j in frequent]
+            _search(child_items, child_words, child_supports, child_mode, itemset, top, index,
+                    n_transactions, max_len)
+
+
+def top_k_rules(data, k=1000, metric='confidence', min_threshold=0.5, min_support=0.01, max_len=None):
+    """
+    The k rules with the highest metric (confidence or lift), at least
+    min_threshold, best first; ties go to the more supported rule.
+    data: one-hot encoded frame (dense or sparse), Transactions or lists of paths.
+    min_support: support floor of the rules (search time and rarity, not the
+    number of rules).
+    Returns a frame with the columns of association_rules.
+    """
+    if metric not in RANKED_METRICS:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {RANKED_METRICS}")
+    matrix, names = vertical_matrix(data)
+    n_transactions = matrix.shape[0]
+    min_count = max(min_support * n_transactions, 1)
+
+    columns, supports = frequent_items(matrix, min_count)
+    order = np.lexsort((columns, supports))
+    columns, supports = columns[order], supports[order]
+    words = bitsets(matrix, columns)
+
+    top = TopKRules(k, metric, min_threshold, min_count)
+    _search([int(c) for c in columns], words, supports, TIDSET, (), top, {}, n_transactions, max_len)
+
+    found = sorted(top.heap, key=lambda entry: entry[:3], reverse=True)
+    antecedents, consequents, sAC, sA, sC = [], [], [], [], []
+    for _, count, _, (itemset, positions, a, c) in found:
+        antecedents.append(frozenset(names[item] for j, item in enumerate(itemset) if j in positions))
+        consequents.append(frozenset(names[item] for j, item in enumerate(itemset) if j not in positions))
+        sAC.append(count / n_transactions)
+        sA.append(a)
+        sC.append(c)
+
+    rules = pd.DataFrame({'antecedents': antecedents, 'consequents': consequents})
+    sAC, sA, sC = np.asarray(sAC, dtype=float), np.asarray(sA, dtype=float), np.asarray(sC, dtype=float)
+    for name in ALL_METRICS:
+        rules[name] = compute_metric(name, sAC, sA, sC)
+    return rules